@@ -7,16 +7,138 @@ Implements multiple optimization strategies based on table metadata and query pa
 
 import json
 import logging
+from functools import lru_cache
+from operator import itemgetter
 from typing import List, Dict, Any, Optional, Tuple
 
+from bigquery_optimizer.utils.config import Config
+
 logger = logging.getLogger(__name__)
 
+# Numeric rank of each priority level, used to sort recommendations
+PRIORITY_VALUES = {"HIGH": 3, "MEDIUM": 2, "LOW": 1}
+
+def recommendation_sort_key(rec: Dict[str, Any]) -> Tuple[int, float]:
+    """Sort key placing higher priority, then higher estimated savings, first"""
+    return (-PRIORITY_VALUES.get(rec.get("priority", "LOW"), 0),
+            -rec.get("estimated_savings_pct", 0))
+
+# Column selection rules, fixed at import rather than rebuilt per field
+PARTITION_COLUMN_TYPES = frozenset(("DATE", "TIMESTAMP", "DATETIME"))
+PARTITION_NAME_KEYWORDS = ("date", "time", "day", "month", "year", "created", "modified", "updated")
+CLUSTER_COLUMN_TYPE_SCORES = {"STRING": 1, "INTEGER": 0.5, "BOOL": 0}
+CLUSTER_NAME_KEYWORDS = ("id", "key", "code", "category", "type", "status", "region", "country")
+FILTER_COLUMN_TYPES = frozenset(("STRING", "INTEGER", "FLOAT", "BOOLEAN", "DATE", "TIMESTAMP"))
+AGGREGATE_COLUMN_TYPES = frozenset(("INTEGER", "FLOAT", "NUMERIC"))
+DIMENSION_COLUMN_TYPES = frozenset(("STRING", "DATE", "TIMESTAMP"))
+INTEGER_TIME_NAME_KEYWORDS = ("time", "timestamp", "date", "epoch")
+
+# Schema preconditions of the recommendation generators, see _schema_flags
+SCHEMA_HAS_FILTER_COLUMNS = 1 << 0
+SCHEMA_HAS_AGGREGATE_COLUMNS = 1 << 1
+SCHEMA_HAS_DIMENSION_COLUMNS = 1 << 2
+SCHEMA_MANY_STRING_COLUMNS = 1 << 3
+SCHEMA_WIDE = 1 << 4
+SCHEMA_HAS_INTEGER_TIME_COLUMNS = 1 << 5
+MATERIALIZED_VIEW_FLAGS = SCHEMA_HAS_AGGREGATE_COLUMNS | SCHEMA_HAS_DIMENSION_COLUMNS
+COLUMN_RECOMMENDATION_FLAGS = SCHEMA_MANY_STRING_COLUMNS | SCHEMA_WIDE | SCHEMA_HAS_INTEGER_TIME_COLUMNS
+
+@lru_cache(maxsize=1024)
+def _decode_schema(schema_json: str) -> Tuple[Dict[str, Any], ...]:
+    """
+    Decode a table's schema JSON
+
+    Cached on the raw JSON, so tables sharing a schema (e.g. date-sharded
+    tables) are decoded once. The field dicts are shared and must not be
+    modified.
+    """
+    return tuple(json.loads(schema_json))
+
+@lru_cache(maxsize=1024)
+def _schema_flags(schema_json: str) -> int:
+    """
+    Summarize which schema-driven recommendations a schema could produce
+
+    Each SCHEMA_* bit records one precondition of a recommendation generator,
+    so analyze_data can skip generators whose column scan would find nothing.
+    Cached on the raw JSON like _column_candidates.
+
+    Args:
+        schema_json: Table schema as a JSON list of field dictionaries
+
+    Returns:
+        Bitwise OR of the SCHEMA_* flags that hold for the schema
+    """
+    fields = _decode_schema(schema_json)
+    flags = 0
+    string_columns = 0
+    for field in fields:
+        field_type = field.get("type", "")
+        if field_type in FILTER_COLUMN_TYPES:
+            flags |= SCHEMA_HAS_FILTER_COLUMNS
+        if field_type in AGGREGATE_COLUMN_TYPES:
+            flags |= SCHEMA_HAS_AGGREGATE_COLUMNS
+        elif field_type in DIMENSION_COLUMN_TYPES:
+            flags |= SCHEMA_HAS_DIMENSION_COLUMNS
+        if field_type == "STRING":
+            string_columns += 1
+        elif field_type == "INTEGER":
+            lower_name = field.get("name", "").lower()
+            if any(keyword in lower_name for keyword in INTEGER_TIME_NAME_KEYWORDS):
+                flags |= SCHEMA_HAS_INTEGER_TIME_COLUMNS
+    if string_columns >= 3:
+        flags |= SCHEMA_MANY_STRING_COLUMNS
+    if len(fields) > 50:
+        flags |= SCHEMA_WIDE
+    return flags
+
+@lru_cache(maxsize=1024)
+def _column_candidates(schema_json: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    Find the partitioning and clustering candidate columns of a schema
+
+    Both rule sets are applied in a single pass over the fields, and the
+    result is cached on the raw JSON so tables sharing a schema are scored
+    once. Candidates are ordered by descending score, ties keeping schema
+    order.
+
+    Args:
+        schema_json: Table schema as a JSON list of field dictionaries
+
+    Returns:
+        Tuple of (partition candidate names, cluster candidate names)
+    """
+    partition_columns = []
+    cluster_columns = []
+
+    for field in _decode_schema(schema_json):
+        field_type = field.get("type", "")
+        field_name = field.get("name", "")
+        lower_name = field_name.lower()
+
+        # Date/timestamp fields, preferring date-related names
+        if field_type in PARTITION_COLUMN_TYPES:
+            score = 2 if any(keyword in lower_name for keyword in PARTITION_NAME_KEYWORDS) else 0
+            partition_columns.append((field_name, score))
+
+        # Clustering-friendly types, boosting likely high-cardinality names
+        score = CLUSTER_COLUMN_TYPE_SCORES.get(field_type)
+        if score is not None:
+            if any(keyword in lower_name for keyword in CLUSTER_NAME_KEYWORDS):
+                score += 2
+            cluster_columns.append((field_name, score))
+
+    partition_columns.sort(key=itemgetter(1), reverse=True)
+    cluster_columns.sort(key=itemgetter(1), reverse=True)
+    return (tuple(map(itemgetter(0), partition_columns)),
+            tuple(map(itemgetter(0), cluster_columns)))
+
 class HeuristicAnalyzer:
     """
     Implements heuristic-based analysis for BigQuery optimization recommendations
     """
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Config):
         """
         Initialize the analyzer with the provided configuration
         
@@ -24,8 +146,8 @@ class HeuristicAnalyzer:
             config: Application configuration 
         """
         self.config = config
-        self.table_size_threshold = config.get('table_size_threshold', 0.01)  # GB
-        self.min_query_count = config.get('min_query_count', 0)
+        self.table_size_threshold = config.table_size_threshold  # GB
+        self.min_query_count = config.min_query_count
         
     def analyze_data(self, table_metadata: List[Dict[str, Any]], 
                     query_history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -68,9 +190,15 @@ class HeuristicAnalyzer:
                 logger.warning(f"Could not parse schema for table {table_id}")
                 continue
                 
-            # Find potential columns for partitioning and clustering
-            potential_partition_columns = self._find_partition_candidates(schema_fields)
-            potential_cluster_columns = self._find_cluster_candidates(schema_fields)
+            # Which schema-driven generators could find anything, per schema
+            schema_flags = _schema_flags(table.get("schema", "[]"))
+            
+            # Find potential columns for partitioning and clustering; the cheap
+            # table flags decide whether any recommendation could use them
+            if not is_partitioned or not is_clustered:
+                partition_candidates, cluster_candidates = _column_candidates(table.get("schema", "[]"))
+            potential_partition_columns = list(partition_candidates) if not is_partitioned else []
+            potential_cluster_columns = list(cluster_candidates) if not is_clustered else []
             
             # Generate recommendations
             table_recommendations = []
@@ -102,7 +230,8 @@ class HeuristicAnalyzer:
             # 4. Query optimization recommendations
             bytes_processed = bytes_processed_by_table.get(table_id, 0)
             table_size = table.get("size_bytes", 0)
-            if query_count > 0 and table_size > 0 and bytes_processed > 0:
+            if (query_count > 0 and table_size > 0 and bytes_processed > 0
+                    and schema_flags & SCHEMA_HAS_FILTER_COLUMNS):
                 query_rec = self._generate_query_optimization_recommendation(
                     table_id, table, schema_fields, bytes_processed, table_size, query_count
                 )
@@ -110,7 +239,8 @@ class HeuristicAnalyzer:
                     table_recommendations.append(query_rec)
             
             # 5. Materialized view recommendations
-            if query_count > 0 or size_gb > 0.1:
+            if ((query_count > 0 or size_gb > 0.1)
+                    and schema_flags & MATERIALIZED_VIEW_FLAGS == MATERIALIZED_VIEW_FLAGS):
                 view_rec = self._generate_materialized_view_recommendation(
                     table_id, table, schema_fields, query_count, size_gb
                 )
@@ -118,9 +248,10 @@ class HeuristicAnalyzer:
                     table_recommendations.append(view_rec)
                     
             # 6. Column and data type recommendations
-            column_recs = self._generate_column_recommendations(table_id, table, schema_fields)
-            if column_recs:
-                table_recommendations.extend(column_recs)
+            if schema_flags & COLUMN_RECOMMENDATION_FLAGS:
+                column_recs = self._generate_column_recommendations(table_id, table, schema_fields)
+                if column_recs:
+                    table_recommendations.extend(column_recs)
                 
             # 7. Table lifecycle recommendations
             lifecycle_rec = self._generate_lifecycle_recommendation(table_id, table)
@@ -131,13 +262,10 @@ class HeuristicAnalyzer:
             recommendations.extend(table_recommendations)
         
         # Sort recommendations by priority and estimated savings
-        recommendations.sort(key=lambda x: (
-            -self._priority_to_value(x.get("priority", "LOW")), 
-            -x.get("estimated_savings_pct", 0)
-        ))
+        recommendations.sort(key=recommendation_sort_key)
         
         # Limit number of recommendations if configured
-        limit = self.config.get('recommendation_limit', 100)
+        limit = self.config.recommendation_limit
         if limit > 0 and len(recommendations) > limit:
             recommendations = recommendations[:limit]
         
@@ -170,15 +298,9 @@ class HeuristicAnalyzer:
             
             for table_id in referenced_tables:
                 if table_id:
-                    # Update query count
-                    if table_id not in table_query_counts:
-                        table_query_counts[table_id] = 0
-                    table_query_counts[table_id] += 1
-                    
-                    # Update bytes processed
-                    if table_id not in bytes_processed_by_table:
-                        bytes_processed_by_table[table_id] = 0
-                    bytes_processed_by_table[table_id] += bytes_per_table
+                    # Update query count and bytes processed, one lookup each
+                    table_query_counts[table_id] = table_query_counts.get(table_id, 0) + 1
+                    bytes_processed_by_table[table_id] = bytes_processed_by_table.get(table_id, 0) + bytes_per_table
         
         return table_query_counts, bytes_processed_by_table
     
@@ -193,87 +315,11 @@ class HeuristicAnalyzer:
             List of schema field dictionaries
         """
         try:
-            schema = json.loads(table.get("schema", "[]"))
-            return schema
+            return list(_decode_schema(table.get("schema", "[]")))
         except Exception as e:
             logger.warning(f"Error parsing schema: {e}")
             return []
     
-    def _find_partition_candidates(self, schema_fields: List[Dict[str, Any]]) -> List[str]:
-        """
-        Find potential columns suitable for partitioning
-        
-        Args:
-            schema_fields: List of schema field dictionaries
-            
-        Returns:
-            List of potential partition column names
-        """
-        potential_columns = []
-        
-        for field in schema_fields:
-            field_type = field.get("type", "")
-            field_name = field.get("name", "")
-            
-            # Look for date/timestamp type fields
-            if field_type in ["DATE", "TIMESTAMP", "DATETIME"]:
-                # Priority for date-related columns
-                score = 0
-                
-                # Prefer columns with date in the name
-                if any(keyword in field_name.lower() for keyword in 
-                       ["date", "time", "day", "month", "year", "created", "modified", "updated"]):
-                    score += 2
-                
-                # Add field with score (for sorting)
-                potential_columns.append((field_name, score))
-        
-        # Sort by score (descending)
-        potential_columns.sort(key=lambda x: x[1], reverse=True)
-        
-        # Return column names only
-        return [col[0] for col in potential_columns]
-    
-    def _find_cluster_candidates(self, schema_fields: List[Dict[str, Any]]) -> List[str]:
-        """
-        Find potential columns suitable for clustering
-        
-        Args:
-            schema_fields: List of schema field dictionaries
-            
-        Returns:
-            List of potential cluster column names
-        """
-        potential_columns = []
-        
-        for field in schema_fields:
-            field_type = field.get("type", "")
-            field_name = field.get("name", "")
-            
-            # Look for suitable clustering column types
-            if field_type in ["STRING", "INTEGER", "BOOL"]:
-                # Calculate a preference score
-                score = 0
-                
-                # Prefer specific column types
-                if field_type == "STRING":
-                    score += 1
-                if field_type == "INTEGER":
-                    score += 0.5
-                
-                # Boost score for likely high-cardinality columns
-                if any(keyword in field_name.lower() for keyword in 
-                       ["id", "key", "code", "category", "type", "status", "region", "country"]):
-                    score += 2
-                
-                potential_columns.append((field_name, score))
-        
-        # Sort by score (descending)
-        potential_columns.sort(key=lambda x: x[1], reverse=True)
-        
-        # Return column names only
-        return [col[0] for col in potential_columns]
-    
     def _generate_partition_recommendation(
         self, table_id: str, table: Dict[str, Any], 
         potential_columns: List[str], size_gb: float, query_count: int
@@ -409,7 +455,7 @@ ALTER TABLE `{table_id}_clustered` RENAME TO `{table_id.split('.')[-1]}`;
             cost_impact = "Minimal cost impact"
             
         # Detailed justification
-        partition_field_str = f" on {table.get('partition_field', '')}" if table.get("partition_field") else ""
+        partition_field_str = f" on {partition_field}" if partition_field else ""
         justification = (
             f"Table is already partitioned{partition_field_str} but not clustered. Clustering on "
             f"high-cardinality columns can further improve query performance by co-locating related data. "
@@ -543,7 +589,7 @@ ALTER TABLE `{table_id}_optimized` RENAME TO `{table_id.split('.')[-1]}`;
             field_type = field.get("type", "")
             field_name = field.get("name", "")
             
-            if field_type in ["STRING", "INTEGER", "FLOAT", "BOOLEAN", "DATE", "TIMESTAMP"]:
+            if field_type in FILTER_COLUMN_TYPES:
                 filtering_columns.append(field_name)
         
         if not filtering_columns:
@@ -629,9 +675,9 @@ WHERE
             field_type = field.get("type", "")
             field_name = field.get("name", "")
             
-            if field_type in ["INTEGER", "FLOAT", "NUMERIC"]:
+            if field_type in AGGREGATE_COLUMN_TYPES:
                 agg_candidates.append(field_name)
-            elif field_type in ["STRING", "DATE", "TIMESTAMP"]:
+            elif field_type in DIMENSION_COLUMN_TYPES:
                 dim_candidates.append(field_name)
         
         # Only recommend if we have both dimension and measure columns
@@ -794,7 +840,7 @@ FROM `{table_id}`;
             
         # Check for integer timestamp fields that could be converted to TIMESTAMP
         int_columns = [f for f in schema_fields if f.get("type") == "INTEGER" and 
-                      any(kw in f.get("name", "").lower() for kw in ["time", "timestamp", "date", "epoch"])]
+                      any(kw in f.get("name", "").lower() for kw in INTEGER_TIME_NAME_KEYWORDS)]
         if int_columns:
             timestamp_rec = {
                 "table_id": table_id,
@@ -865,8 +911,3 @@ SET OPTIONS (
             }
         
         return None
-        
-    def _priority_to_value(self, priority: str) -> int:
-        """Convert priority string to numeric value for sorting"""
-        priority_map = {"HIGH": 3, "MEDIUM": 2, "LOW": 1}
-        return priority_map.get(priority, 0)
\ No newline at end of file
@@ -7,127 +7,464 @@ Collects metadata about BigQuery tables and query history.
 import json
 import logging
 import csv
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import chain, islice
+from typing import List, Dict, Any, Callable, Iterable, Optional, Sequence, Tuple
 
 from google.cloud import bigquery
 from google.cloud.exceptions import NotFound
 
+from bigquery_optimizer.utils.config import Config
+
 logger = logging.getLogger(__name__)
 
-def collect_table_metadata(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+QUERY_HISTORY_LIMIT = 1000
+CSV_WRITE_BUFFER_SIZE = 1 << 20  # 1 MiB
+BYTES_PER_GB = 1 << 30
+
+# CSV column order for table metadata and query history records, shared by
+# both metadata paths so the output header is stable across runs
+TABLE_METADATA_FIELDS = (
+    "table_id", "dataset_id", "table_name", "size_bytes", "size_gb", "row_count",
+    "is_partitioned", "partition_field", "partition_type", "is_clustered",
+    "clustering_fields", "last_modified", "days_since_modified", "table_type",
+    "schema", "has_expiration", "expiration_date", "column_count",
+    "has_nested_schema", "storage_billing_model", "creation_time",
+    "has_streaming_buffer", "has_labels", "has_description",
+)
+QUERY_HISTORY_FIELDS = (
+    "job_id", "creation_time", "user_email", "query_text", "total_bytes_processed",
+    "total_slot_ms", "referenced_tables", "status", "duration_ms",
+)
+
+# Older client libraries have no Table.storage_billing_model; check once
+# instead of probing every table with getattr()
+_TABLE_HAS_BILLING_MODEL = hasattr(bigquery.Table, "storage_billing_model")
+
+# Shared compact encoder for the JSON-valued CSV columns (schema, clustering)
+_JSON_ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+# get_table/list_tables results are reused for a short while, so repeated
+# collections in one process don't re-fetch identical metadata
+API_CACHE_TTL_SECONDS = 300
+API_CACHE_MAX_ENTRIES = 1024
+_api_cache: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+_api_cache_lock = threading.Lock()
+
+def _ttl_cached(key: Tuple[str, str], loader: Callable[[], Any]) -> Any:
+    """
+    Return a cached API result for key, calling loader on a miss or expiry
+
+    Errors from loader are not cached, so a failed lookup is retried on the
+    next call (the client's own retry policy handles transient errors).
+
+    Args:
+        key: Cache key, e.g. ("table", table_id)
+        loader: Zero-argument function performing the API call
+
+    Returns:
+        The cached or freshly loaded result
+    """
+    now = time.monotonic()
+    with _api_cache_lock:
+        entry = _api_cache.get(key)
+        if entry is not None and now - entry[0] < API_CACHE_TTL_SECONDS:
+            return entry[1]
+
+    value = loader()
+
+    with _api_cache_lock:
+        _api_cache.pop(key, None)
+        if len(_api_cache) >= API_CACHE_MAX_ENTRIES:
+            # Dicts keep insertion order, so the first key is the oldest entry
+            del _api_cache[next(iter(_api_cache))]
+        _api_cache[key] = (now, value)
+    return value
+
+# One query per dataset replaces a get_table() round-trip per table.
+# __TABLES__ supplies size/row counts; INFORMATION_SCHEMA supplies the rest.
+DATASET_METADATA_SQL = """
+WITH columns AS (
+    SELECT
+        c.table_name,
+        ARRAY_AGG(STRUCT(
+            c.column_name,
+            c.data_type,
+            c.is_nullable,
+            c.is_partitioning_column,
+            c.clustering_ordinal_position,
+            p.description
+        ) ORDER BY c.ordinal_position) AS columns
+    FROM
+        `{dataset}.INFORMATION_SCHEMA.COLUMNS` AS c
+    LEFT JOIN
+        `{dataset}.INFORMATION_SCHEMA.COLUMN_FIELD_PATHS` AS p
+        ON p.table_name = c.table_name
+        AND p.column_name = c.column_name
+        AND p.field_path = c.column_name
+    GROUP BY
+        c.table_name
+),
+options AS (
+    SELECT
+        table_name,
+        SAFE_CAST(REGEXP_EXTRACT(
+            MAX(IF(option_name = 'expiration_timestamp', option_value, NULL)), r'"(.*)"'
+        ) AS TIMESTAMP) AS expiration_time,
+        LOGICAL_OR(option_name = 'labels') AS has_labels,
+        LOGICAL_OR(option_name = 'description') AS has_description
+    FROM
+        `{dataset}.INFORMATION_SCHEMA.TABLE_OPTIONS`
+    GROUP BY
+        table_name
+)
+SELECT
+    t.table_name,
+    t.table_type,
+    t.creation_time,
+    t.ddl,
+    s.size_bytes,
+    s.row_count,
+    TIMESTAMP_MILLIS(s.last_modified_time) AS last_modified_time,
+    TIMESTAMP_DIFF(CURRENT_TIMESTAMP(), TIMESTAMP_MILLIS(s.last_modified_time), DAY) AS days_since_modified,
+    c.columns,
+    o.expiration_time,
+    o.has_labels,
+    o.has_description
+FROM
+    `{dataset}.INFORMATION_SCHEMA.TABLES` AS t
+LEFT JOIN
+    `{dataset}.__TABLES__` AS s
+    ON s.table_id = t.table_name
+LEFT JOIN
+    columns AS c
+    ON c.table_name = t.table_name
+LEFT JOIN
+    options AS o
+    ON o.table_name = t.table_name
+"""
+
+# INFORMATION_SCHEMA names that differ from the tables API / legacy SQL names
+_TABLE_TYPES = {"BASE TABLE": "TABLE", "CLONE": "TABLE", "MATERIALIZED VIEW": "MATERIALIZED_VIEW"}
+_FIELD_TYPES = {"INT64": "INTEGER", "FLOAT64": "FLOAT", "BOOL": "BOOLEAN", "STRUCT": "RECORD"}
+
+_PARTITION_BY_RE = re.compile(r"^PARTITION BY (.+)$", re.MULTILINE)
+_PARTITION_UNIT_RE = re.compile(r"\b(HOUR|DAY|MONTH|YEAR)\b")
+
+def _schema_field(column: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert an INFORMATION_SCHEMA.COLUMNS entry to the schema field format
+    produced by the tables API (legacy type names, NULLABLE/REQUIRED/REPEATED)
+
+    Args:
+        column: Aggregated column struct from DATASET_METADATA_SQL
+
+    Returns:
+        Dict with name, type, mode and description
+    """
+    data_type = column["data_type"]
+    if data_type.startswith("ARRAY<"):
+        mode = "REPEATED"
+        data_type = data_type[len("ARRAY<"):-1]
+    else:
+        mode = "NULLABLE" if column["is_nullable"] == "YES" else "REQUIRED"
+
+    # Drop type parameters, e.g. STRING(10), NUMERIC(10, 2), STRUCT<...>
+    base_type = data_type.split("<", 1)[0].split("(", 1)[0].strip()
+
+    return {
+        "name": column["column_name"],
+        "type": _FIELD_TYPES.get(base_type, base_type),
+        "mode": mode,
+        "description": column["description"]
+    }
+
+def _time_partitioning_type(ddl: Optional[str]) -> Optional[str]:
+    """
+    Derive the time partitioning type from a table's DDL
+
+    Args:
+        ddl: CREATE statement from INFORMATION_SCHEMA.TABLES
+
+    Returns:
+        HOUR/DAY/MONTH/YEAR, or None if the table is not time-partitioned
+        (integer-range partitioning is not time partitioning)
+    """
+    match = _PARTITION_BY_RE.search(ddl or "")
+    if not match or "RANGE_BUCKET" in match.group(1):
+        return None
+    unit = _PARTITION_UNIT_RE.search(match.group(1))
+    return unit.group(1) if unit else "DAY"
+
+def _fetch_dataset_metadata(client: bigquery.Client, project_id: str, dataset_id: str) -> List[Dict[str, Any]]:
+    """
+    Collect metadata for every table in a dataset with a single query
+
+    Args:
+        client: BigQuery client
+        project_id: GCP project ID
+        dataset_id: Dataset to scan
+
+    Returns:
+        List[Dict]: Table metadata records, in the same format as the
+        per-table get_table() path
+    """
+    query = DATASET_METADATA_SQL.format(dataset=f"{project_id}.{dataset_id}")
+
+    metadata = []
+    for row in client.query(query).result():
+        columns = row.columns or []
+        schema_fields = [_schema_field(column) for column in columns]
+
+        # Extract partitioning info (ingestion-time partitioning has no column)
+        partition_type = _time_partitioning_type(row.ddl)
+        is_partitioned = partition_type is not None
+        partition_field = next(
+            (c["column_name"] for c in columns if c["is_partitioning_column"] == "YES"), None
+        ) if is_partitioned else None
+
+        # Extract clustering info, in clustering order
+        clustering = [
+            c["column_name"]
+            for c in sorted(columns, key=lambda c: c["clustering_ordinal_position"] or 0)
+            if c["clustering_ordinal_position"]
+        ]
+        is_clustered = bool(clustering)
+
+        size_bytes = row.size_bytes or 0
+
+        metadata.append({
+            "table_id": f"{project_id}.{dataset_id}.{row.table_name}",
+            "dataset_id": dataset_id,
+            "table_name": row.table_name,
+            "size_bytes": size_bytes,
+            "size_gb": size_bytes / BYTES_PER_GB if size_bytes else 0,
+            "row_count": row.row_count or 0,
+            "is_partitioned": is_partitioned,
+            "partition_field": partition_field,
+            "partition_type": partition_type,
+            "is_clustered": is_clustered,
+            "clustering_fields": _JSON_ENCODER.encode(clustering) if is_clustered else None,
+            "last_modified": row.last_modified_time.isoformat() if row.last_modified_time else None,
+            "days_since_modified": row.days_since_modified,
+            "table_type": _TABLE_TYPES.get(row.table_type, row.table_type),
+            "schema": _JSON_ENCODER.encode(schema_fields),
+            "has_expiration": row.expiration_time is not None,
+            "expiration_date": row.expiration_time.isoformat() if row.expiration_time else None,
+            "column_count": len(schema_fields),
+            "has_nested_schema": any(f["type"] == "RECORD" for f in schema_fields),
+            "storage_billing_model": None,
+            "creation_time": row.creation_time.isoformat() if row.creation_time else None,
+            # The streaming buffer is not exposed through dataset-level views
+            "has_streaming_buffer": None,
+            "has_labels": bool(row.has_labels),
+            "has_description": bool(row.has_description)
+        })
+
+    return metadata
+
+def _table_metadata_record(client: bigquery.Client, table_ref: bigquery.TableReference,
+                           dataset_id: str, now_ts: float) -> Optional[Dict[str, Any]]:
+    """
+    Build the metadata record for one table from a get_table() call
+
+    Args:
+        client: BigQuery client (shared across threads)
+        table_ref: Table to look up
+        dataset_id: Dataset the table belongs to
+        now_ts: Current POSIX timestamp, shared by every table in the run
+
+    Returns:
+        Dict of table metadata, or None if the table could not be read
+    """
+    table_id = f"{table_ref.project}.{table_ref.dataset_id}.{table_ref.table_id}"
+    logger.info(f"Processing table: {table_id}")
+    
+    try:
+        # Get table details
+        table = _ttl_cached(("table", table_id), lambda: client.get_table(table_id))
+        
+        # Extract basic info
+        size_bytes = table.num_bytes or 0
+        size_gb = size_bytes / BYTES_PER_GB if size_bytes else 0
+        row_count = table.num_rows or 0
+        
+        # Extract partitioning info
+        is_partitioned = table.time_partitioning is not None
+        partition_field = table.time_partitioning.field if is_partitioned and table.time_partitioning else None
+        partition_type = table.time_partitioning.type_ if is_partitioned and table.time_partitioning else None
+        
+        # Extract clustering info
+        is_clustered = table.clustering_fields is not None
+        clustering_fields = _JSON_ENCODER.encode(table.clustering_fields) if is_clustered else None
+        
+        # Extract schema
+        schema_fields = [{
+            "name": field.name,
+            "type": field.field_type,
+            "mode": field.mode,
+            "description": field.description
+        } for field in table.schema]
+        
+        schema_json = _JSON_ENCODER.encode(schema_fields)
+        
+        # Check for table expiration
+        has_expiration = table.expires is not None
+        expiration_date = table.expires.isoformat() if has_expiration else None
+        
+        # Check for labels and description
+        has_labels = bool(table.labels)
+        has_description = bool(table.description)
+        
+        # Create metadata record
+        return {
+            "table_id": table_id,
+            "dataset_id": dataset_id,
+            "table_name": table_ref.table_id,
+            "size_bytes": size_bytes,
+            "size_gb": size_gb,
+            "row_count": row_count,
+            "is_partitioned": is_partitioned,
+            "partition_field": partition_field,
+            "partition_type": partition_type,
+            "is_clustered": is_clustered,
+            "clustering_fields": clustering_fields,
+            "last_modified": table.modified.isoformat() if table.modified else None,
+            "days_since_modified": int((now_ts - table.modified.timestamp()) // 86400) if table.modified else None,
+            "table_type": table.table_type,
+            "schema": schema_json,
+            "has_expiration": has_expiration,
+            "expiration_date": expiration_date,
+            "column_count": len(schema_fields),
+            "has_nested_schema": any(f.get("type") == "RECORD" for f in schema_fields),
+            "storage_billing_model": table.storage_billing_model if _TABLE_HAS_BILLING_MODEL else None,
+            "creation_time": table.created.isoformat() if table.created else None,
+            "has_streaming_buffer": table.streaming_buffer is not None,
+            "has_labels": has_labels,
+            "has_description": has_description
+        }
+        
+    except Exception as e:
+        logger.warning(f"Error processing table {table_id}: {e}")
+        return None
+
+def _fetch_dataset_metadata_per_table(client: bigquery.Client, project_id: str, dataset_id: str,
+                                      max_workers: int, page_size: int,
+                                      slots: threading.Semaphore) -> List[Dict[str, Any]]:
+    """
+    Collect metadata for every table in a dataset with one get_table() call per table
+
+    Fallback for when the INFORMATION_SCHEMA query is not permitted.
+
+    Args:
+        client: BigQuery client (shared across threads)
+        project_id: GCP project ID
+        dataset_id: Dataset to scan
+        max_workers: Maximum number of concurrent get_table() calls
+        page_size: Tables requested per list_tables page
+        slots: Semaphore shared by every dataset's fallback, bounding the
+            total number of get_table() calls in flight on the shared client
+
+    Returns:
+        List[Dict]: Table metadata records
+    """
+    # List tables in this dataset
+    dataset_ref = f"{project_id}.{dataset_id}"
+    tables = _ttl_cached(("tables", dataset_ref), lambda: list(client.list_tables(dataset_ref, page_size=page_size)))
+    logger.info(f"Found {len(tables)} tables in dataset {dataset_id}")
+    
+    if not tables:
+        return []
+    
+    # Fetch table details concurrently; map() keeps the listing order
+    now_ts = time.time()
+    def fetch_record(table_ref):
+        with slots:
+            return _table_metadata_record(client, table_ref, dataset_id, now_ts)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tables))) as executor:
+        records = executor.map(fetch_record, tables)
+        return [record for record in records if record is not None]
+
+def _collect_dataset_metadata(client: bigquery.Client, project_id: str, dataset_id: str,
+                              max_workers: int, page_size: int,
+                              fallback_slots: threading.Semaphore) -> List[Dict[str, Any]]:
+    """
+    Collect metadata for one dataset, preferring the single-query path
+
+    Args:
+        client: BigQuery client (shared across threads)
+        project_id: GCP project ID
+        dataset_id: Dataset to scan
+        max_workers: Maximum number of concurrent get_table() calls on fallback
+        page_size: Tables requested per list_tables page on fallback
+        fallback_slots: Semaphore bounding get_table() calls across all datasets
+
+    Returns:
+        List[Dict]: Table metadata records
+    """
+    logger.info(f"Processing dataset: {dataset_id}")
+    
+    try:
+        dataset_metadata = _fetch_dataset_metadata(client, project_id, dataset_id)
+        logger.info(f"Found {len(dataset_metadata)} tables in dataset {dataset_id}")
+        return dataset_metadata
+    except Exception as e:
+        logger.warning(f"Metadata query failed for dataset {dataset_id}, falling back to per-table lookups: {e}")
+        return _fetch_dataset_metadata_per_table(client, project_id, dataset_id, max_workers, page_size, fallback_slots)
+
+def collect_table_metadata(config: Config) -> List[Dict[str, Any]]:
     """
     Collect metadata about BigQuery tables in the project
     
+    Each dataset is read with a single INFORMATION_SCHEMA query, falling
+    back to per-table get_table() calls if that query fails. Datasets are
+    processed concurrently on up to config.metadata_workers threads, and
+    fallback get_table() calls across all datasets are capped at the same
+    number, so the shared client never sees more than that many at once.
+    
     Args:
         config: Application configuration
         
     Returns:
         List[Dict]: List of table metadata
     """
-    project_id = config['project_id']
-    output_file = config['output_metadata_file']
+    project_id = config.project_id
+    output_file = config.output_metadata_file
+    max_workers = max(1, config.metadata_workers)
+    page_size = config.list_page_size
     
     logger.info(f"Collecting table metadata for project {project_id}")
     client = bigquery.Client(project=project_id)
     
-    metadata = []
-    
     try:
-        # List all datasets in the project
-        datasets = list(client.list_datasets())
-        logger.info(f"Found {len(datasets)} datasets in project {project_id}")
+        # Process datasets concurrently as listing pages arrive, rather than
+        # waiting for the full listing; map() keeps the listing order and the
+        # per-dataset lists are flattened straight into one result list
+        datasets = client.list_datasets(page_size=page_size)
+        fallback_slots = threading.BoundedSemaphore(max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            metadata = list(chain.from_iterable(executor.map(
+                lambda dataset: _collect_dataset_metadata(
+                    client, project_id, dataset.dataset_id, max_workers, page_size, fallback_slots
+                ),
+                datasets
+            )))
         
-        if not datasets:
+        logger.info(f"Found {datasets.num_results} datasets in project {project_id}")
+        
+        if not datasets.num_results:
             logger.warning(f"No datasets found in project {project_id}")
             return []
             
-        # Process each dataset
-        for dataset in datasets:
-            dataset_id = dataset.dataset_id
-            logger.info(f"Processing dataset: {dataset_id}")
-            
-            # List tables in this dataset
-            tables = list(client.list_tables(f"{project_id}.{dataset_id}"))
-            logger.info(f"Found {len(tables)} tables in dataset {dataset_id}")
-            
-            # Process each table
-            for table_ref in tables:
-                table_id = f"{table_ref.project}.{table_ref.dataset_id}.{table_ref.table_id}"
-                logger.info(f"Processing table: {table_id}")
-                
-                try:
-                    # Get table details
-                    table = client.get_table(table_id)
-                    
-                    # Extract basic info
-                    size_bytes = table.num_bytes or 0
-                    size_gb = size_bytes / (1024**3) if size_bytes else 0
-                    row_count = table.num_rows or 0
-                    
-                    # Extract partitioning info
-                    is_partitioned = table.time_partitioning is not None
-                    partition_field = table.time_partitioning.field if is_partitioned and table.time_partitioning else None
-                    partition_type = table.time_partitioning.type_ if is_partitioned and table.time_partitioning else None
-                    
-                    # Extract clustering info
-                    is_clustered = table.clustering_fields is not None
-                    clustering_fields = json.dumps(table.clustering_fields) if is_clustered else None
-                    
-                    # Extract schema
-                    schema_fields = [{
-                        "name": field.name,
-                        "type": field.field_type,
-                        "mode": field.mode,
-                        "description": field.description
-                    } for field in table.schema]
-                    
-                    schema_json = json.dumps(schema_fields)
-                    
-                    # Check for table expiration
-                    has_expiration = table.expires is not None
-                    expiration_date = table.expires.isoformat() if has_expiration else None
-                    
-                    # Check for labels and description
-                    has_labels = bool(table.labels)
-                    has_description = bool(table.description)
-                    
-                    # Create metadata record
-                    metadata.append({
-                        "table_id": table_id,
-                        "dataset_id": dataset_id,
-                        "table_name": table_ref.table_id,
-                        "size_bytes": size_bytes,
-                        "size_gb": size_gb,
-                        "row_count": row_count,
-                        "is_partitioned": is_partitioned,
-                        "partition_field": partition_field,
-                        "partition_type": partition_type,
-                        "is_clustered": is_clustered,
-                        "clustering_fields": clustering_fields,
-                        "last_modified": table.modified.isoformat() if table.modified else None,
-                        "days_since_modified": (datetime.now(table.modified.tzinfo) - table.modified).days if table.modified else None,
-                        "table_type": table.table_type,
-                        "schema": schema_json,
-                        "has_expiration": has_expiration,
-                        "expiration_date": expiration_date,
-                        "column_count": len(schema_fields),
-                        "has_nested_schema": any(f.get("type") == "RECORD" for f in schema_fields),
-                        "storage_billing_model": getattr(table, "storage_billing_model", None),
-                        "creation_time": table.created.isoformat() if table.created else None,
-                        "has_streaming_buffer": getattr(table, "streaming_buffer", None) is not None,
-                        "has_labels": has_labels,
-                        "has_description": has_description
-                    })
-                    
-                except Exception as e:
-                    logger.warning(f"Error processing table {table_id}: {e}")
-                    continue
-        
         logger.info(f"Collected metadata for {len(metadata)} tables")
         
         # Save metadata to CSV file
-        save_to_csv(metadata, output_file)
+        save_to_csv(metadata, output_file, TABLE_METADATA_FIELDS)
         
         return metadata
         
@@ -135,9 +472,95 @@ def collect_table_metadata(config: Dict[str, Any]) -> List[Dict[str, Any]]:
         logger.error(f"Error collecting table metadata: {e}")
         return []
 
-def collect_query_history(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+QUERY_HISTORY_SQL = f"""
+SELECT
+    job_id,
+    creation_time,
+    user_email,
+    query,
+    total_bytes_processed,
+    total_slot_ms,
+    state AS status,
+    error_result,
+    TIMESTAMP_DIFF(end_time, start_time, MILLISECOND) AS duration_ms,
+    (SELECT ARRAY_AGG(DISTINCT table_id)
+     FROM UNNEST(referenced_tables) AS t) AS referenced_tables
+FROM
+    `region-us`.INFORMATION_SCHEMA.JOBS
+WHERE
+    creation_time >= @start_time
+    AND creation_time < @end_time
+    AND project_id = @project_id
+    AND job_type = 'QUERY'
+    AND query NOT LIKE '%INFORMATION_SCHEMA%'
+    AND query IS NOT NULL
+ORDER BY
+    creation_time DESC
+LIMIT {QUERY_HISTORY_LIMIT}
+"""
+
+def _split_time_range(start: datetime, end: datetime, shards: int) -> List[Tuple[datetime, datetime]]:
+    """
+    Split [start, end) into contiguous, non-overlapping sub-ranges
+
+    Args:
+        start: Range start (inclusive)
+        end: Range end (exclusive)
+        shards: Number of sub-ranges to produce
+
+    Returns:
+        List of (start, end) tuples, newest range first
+    """
+    step = (end - start) / shards
+    bounds = [start + step * i for i in range(shards)] + [end]
+    return [(bounds[i], bounds[i + 1]) for i in reversed(range(shards))]
+
+def _fetch_query_history_shard(client: bigquery.Client, project_id: str,
+                               time_range: Tuple[datetime, datetime]) -> List[Dict[str, Any]]:
+    """
+    Fetch query history records for a single time range
+
+    Args:
+        client: BigQuery client (shared across threads)
+        project_id: GCP project ID
+        time_range: (start, end) tuple of timezone-aware datetimes
+
+    Returns:
+        List[Dict]: Query history records for the range, newest first
+    """
+    start_time, end_time = time_range
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ScalarQueryParameter("start_time", "TIMESTAMP", start_time),
+        bigquery.ScalarQueryParameter("end_time", "TIMESTAMP", end_time),
+        bigquery.ScalarQueryParameter("project_id", "STRING", project_id),
+    ])
+
+    query_job = client.query(QUERY_HISTORY_SQL, job_config=job_config)
+
+    query_history = []
+    for row in query_job.result():
+        # Build query history record
+        history = {
+            "job_id": row.job_id,
+            "creation_time": row.creation_time.isoformat() if row.creation_time else None,
+            "user_email": row.user_email,
+            "query_text": row.query,
+            "total_bytes_processed": row.total_bytes_processed,
+            "total_slot_ms": row.total_slot_ms,
+            "referenced_tables": str(row.referenced_tables),
+            "status": row.status,
+            "duration_ms": row.duration_ms
+        }
+        query_history.append(history)
+
+    return query_history
+
+def collect_query_history(config: Config) -> List[Dict[str, Any]]:
     """
     Collect query history from BigQuery
+
+    The lookback window is split into day-range shards which are queried
+    concurrently; the newest QUERY_HISTORY_LIMIT records overall are kept.
     
     Args:
         config: Application configuration
@@ -145,67 +568,35 @@ def collect_query_history(config: Dict[str, Any]) -> List[Dict[str, Any]]:
     Returns:
         List[Dict]: List of query history records
     """
-    project_id = config['project_id']
-    days = config['lookback_days']
-    output_file = config['output_queries_file']
+    project_id = config.project_id
+    days = config.lookback_days
+    output_file = config.output_queries_file
+    shards = max(1, min(config.query_history_shards, days))
     
-    logger.info(f"Collecting query history for the last {days} days")
+    logger.info(f"Collecting query history for the last {days} days in {shards} shards")
     client = bigquery.Client(project=project_id)
     
     try:
-        # Calculate the start date
-        start_date = datetime.now() - timedelta(days=days)
-        
-        # Query INFORMATION_SCHEMA.JOBS to get query history
-        query = f"""
-        SELECT
-            job_id,
-            creation_time,
-            user_email,
-            query,
-            total_bytes_processed,
-            total_slot_ms,
-            state AS status,
-            error_result,
-            TIMESTAMP_DIFF(end_time, start_time, MILLISECOND) AS duration_ms,
-            (SELECT ARRAY_AGG(DISTINCT table_id)
-             FROM UNNEST(referenced_tables) AS t) AS referenced_tables
-        FROM
-            `region-us`.INFORMATION_SCHEMA.JOBS
-        WHERE
-            creation_time >= TIMESTAMP('{start_date.strftime("%Y-%m-%d")}')
-            AND project_id = '{project_id}'
-            AND job_type = 'QUERY'
-            AND query NOT LIKE '%INFORMATION_SCHEMA%'
-            AND query IS NOT NULL
-        ORDER BY
-            creation_time DESC
-        LIMIT 1000
-        """
-        
-        query_job = client.query(query)
-        results = list(query_job.result())
-        
-        query_history = []
-        for row in results:
-            # Build query history record
-            history = {
-                "job_id": row.job_id,
-                "creation_time": row.creation_time.isoformat() if row.creation_time else None,
-                "user_email": row.user_email,
-                "query_text": row.query,
-                "total_bytes_processed": row.total_bytes_processed,
-                "total_slot_ms": row.total_slot_ms,
-                "referenced_tables": str(row.referenced_tables),
-                "status": row.status,
-                "duration_ms": row.duration_ms
-            }
-            query_history.append(history)
+        # Calculate the time range, starting at midnight UTC of the first day
+        end_time = datetime.now(timezone.utc)
+        start_date = (end_time - timedelta(days=days)).date()
+        start_time = datetime.combine(start_date, datetime.min.time(), tzinfo=timezone.utc)
+        time_ranges = _split_time_range(start_time, end_time, shards)
+        
+        # Query INFORMATION_SCHEMA.JOBS for each shard concurrently
+        with ThreadPoolExecutor(max_workers=shards) as executor:
+            shard_results = executor.map(
+                lambda time_range: _fetch_query_history_shard(client, project_id, time_range),
+                time_ranges
+            )
+            # Shards are newest first and each is sorted, so concatenation preserves
+            # order; stop consuming once the limit is reached
+            query_history = list(islice(chain.from_iterable(shard_results), QUERY_HISTORY_LIMIT))
         
         logger.info(f"Collected {len(query_history)} query history records")
         
         # Save query history to CSV file
-        save_to_csv(query_history, output_file)
+        save_to_csv(query_history, output_file, QUERY_HISTORY_FIELDS)
         
         return query_history
         
@@ -213,27 +604,60 @@ def collect_query_history(config: Dict[str, Any]) -> List[Dict[str, Any]]:
         logger.error(f"Error collecting query history: {e}")
         return []
 
-def save_to_csv(data: List[Dict[str, Any]], filename: str) -> None:
+def save_to_csv(data: Iterable[Dict[str, Any]], filename: str,
+                fieldnames: Optional[Sequence[str]] = None) -> None:
     """
     Save data to CSV file
+
+    Unless fieldnames is given, columns for a list are the union of all record
+    keys in first-seen order, so records with differing keys (e.g. mixed
+    recommendation types) share one header. Any other iterable is streamed to
+    disk without being materialized; its columns are taken from the first
+    record. dict and list values are written as compact JSON rather than their
+    Python repr; records are not modified.
     
     Args:
-        data: List of dictionaries to save
+        data: List or iterable of dictionaries to save
         filename: Output file path
+        fieldnames: Optional fixed column order; keys not listed are dropped
     """
-    if not data:
+    if isinstance(data, list):
+        records = data
+        if not data:
+            fieldnames = []
+        elif fieldnames is not None:
+            fieldnames = list(fieldnames)
+        else:
+            fieldnames = list(dict.fromkeys(key for record in data for key in record))
+    else:
+        # Peek at the first record; an empty iterator is "no data" just like an empty list
+        records = iter(data)
+        first = next(records, None)
+        if first is None:
+            fieldnames = []
+        else:
+            fieldnames = list(fieldnames) if fieldnames is not None else list(first)
+            records = chain((first,), records)
+    
+    if not fieldnames:
         logger.info(f"No data to save to {filename}")
         return
     
     try:
-        fieldnames = data[0].keys()
-        
-        with open(filename, 'w', newline='') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(data)
+        with open(filename, 'w', newline='', buffering=CSV_WRITE_BUFFER_SIZE) as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(fieldnames)
+            encode = _JSON_ENCODER.encode
+            writer.writerows(
+                [value if not isinstance(value, (dict, list)) else encode(value)
+                 for value in map(record.get, fieldnames)]
+                for record in records
+            )
             
-        logger.info(f"Saved {len(data)} records to {filename}")
+        if isinstance(data, list):
+            logger.info(f"Saved {len(data)} records to {filename}")
+        else:
+            logger.info(f"Streamed records to {filename}")
         
     except Exception as e:
-        logger.error(f"Error saving data to {filename}: {e}")
\ No newline at end of file
+        logger.error(f"Error saving data to {filename}: {e}")
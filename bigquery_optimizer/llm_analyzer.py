@@ -6,17 +6,86 @@ Analyzes BigQuery queries using LLMs to provide optimization recommendations.
 
 import json
 import logging
+import re
+import sys
 import requests
 from typing import List, Dict, Any, Optional
 
+from bigquery_optimizer.utils.config import Config
+
 logger = logging.getLogger(__name__)
 
+# Fields salvaged from malformed LLM JSON, in the order of _RECOMMENDATION_FIELD_RE's
+# groups. One alternation per field lets a single finditer pass find them all.
+_RECOMMENDATION_FIELDS = (
+    "recommendation_type", "recommendation", "justification",
+    "implementation", "estimated_savings_pct", "priority",
+)
+# Fields drawn from a handful of values; interned so equal values share one str
+_INTERNED_FIELDS = frozenset(("recommendation_type", "priority"))
+# Free-text values may span lines and contain quotes; they end at the first quote
+# followed by ', "'. Matching runs of non-quote characters, rather than a lazy
+# DOTALL .*?, avoids re-testing the lookahead after every character
+_FREE_TEXT_VALUE = r'"([^"]*(?:"(?!\s*,\s*")[^"]*)*)"(?=\s*,\s*")'
+_RECOMMENDATION_FIELD_RE = re.compile(
+    r'"(?:recommendation_type"\s*:\s*"([^"]+)"'
+    r'|recommendation"\s*:\s*"([^"]+)"'
+    r'|justification"\s*:\s*' + _FREE_TEXT_VALUE +
+    r'|implementation"\s*:\s*' + _FREE_TEXT_VALUE +
+    r'|estimated_savings_pct"\s*:\s*(\d+)'
+    r'|priority"\s*:\s*"([^"]+)")'
+)
+# Values used for fields the manual extraction could not find. Shared and copied
+# per record, so the defaults are built once rather than on every salvage
+_MANUAL_RECOMMENDATION_DEFAULTS = {
+    "recommendation_type": "QUERY_OPTIMIZATION",
+    "recommendation": "Optimize query structure",
+    "justification": "Extracted from LLM response",
+    "implementation": "See detailed recommendations",
+    "estimated_savings_pct": 10,
+    "priority": "MEDIUM",
+}
+
+# Table references in query text and in stringified referenced_tables lists
+_FROM_TABLE_RE = re.compile(r'FROM\s+([^\s,;()]+)')
+_JOIN_TABLE_RE = re.compile(r'JOIN\s+([^\s,;()]+)')
+_QUOTED_RE = re.compile(r'[\'"]([^\'"]*)[\'"]')
+
+# ASCII control characters, stripped with str.translate instead of a regex
+_CONTROL_CHARS = dict.fromkeys([*range(0x20), 0x7F])
+# C0 controls other than newline, for the aggressive cleanup retry
+_CONTROL_CHARS_EXCEPT_NEWLINE = dict.fromkeys(c for c in range(0x20) if c != 0x0A)
+
+def _repair_json(json_str: str) -> Optional[Dict[str, Any]]:
+    """
+    Retry parsing after cheap repairs for common LLM JSON slips
+
+    Closes braces left unbalanced and, when the text contains no double
+    quotes at all, treats single quotes as string delimiters.
+
+    Args:
+        json_str: JSON text that failed to parse
+
+    Returns:
+        Parsed object, or None if the repaired text still does not parse
+    """
+    repaired = json_str + "}" * max(0, json_str.count("{") - json_str.count("}"))
+    if '"' not in repaired:
+        repaired = repaired.replace("'", '"')
+    if repaired == json_str:
+        return None
+    try:
+        result = json.loads(repaired)
+    except json.JSONDecodeError:
+        return None
+    return result if isinstance(result, dict) else None
+
 class LLMAnalyzer:
     """
     Implements LLM-based analysis for BigQuery optimization recommendations
     """
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Config):
         """
         Initialize the analyzer with the provided configuration
         
@@ -24,10 +93,10 @@ class LLMAnalyzer:
             config: Application configuration
         """
         self.config = config
-        self.ollama_endpoint = config['ollama_endpoint']
-        self.model = config['ollama_model']
-        self.temperature = config['temperature']
-        self.max_tokens = config['max_tokens']
+        self.ollama_endpoint = config.ollama_endpoint
+        self.model = config.ollama_model
+        self.temperature = config.temperature
+        self.max_tokens = config.max_tokens
     
     def _extract_recommendation_manually(self, json_str: str, referenced_tables=None) -> Optional[Dict[str, Any]]:
         """
@@ -40,49 +109,25 @@ class LLMAnalyzer:
         Returns:
             Dict containing extracted fields or None
         """
-        import re
-        
         # Initialize default recommendation
-        recommendation = {
-            "recommendation_type": "QUERY_OPTIMIZATION",
-            "recommendation": "Optimize query structure",
-            "justification": "Extracted from LLM response",
-            "implementation": "See detailed recommendations",
-            "estimated_savings_pct": 10,
-            "priority": "MEDIUM"
-        }
+        recommendation = dict(_MANUAL_RECOMMENDATION_DEFAULTS)
         
         # Try to extract each field using regex patterns
         try:
-            # Extract recommendation type
-            rec_type_match = re.search(r'"recommendation_type"\s*:\s*"([^"]+)"', json_str)
-            if rec_type_match:
-                recommendation["recommendation_type"] = rec_type_match.group(1).strip()
-                
-            # Extract recommendation
-            rec_match = re.search(r'"recommendation"\s*:\s*"([^"]+)"', json_str)
-            if rec_match:
-                recommendation["recommendation"] = rec_match.group(1).strip()
-                
-            # Extract justification - might contain newlines
-            just_match = re.search(r'"justification"\s*:\s*"(.*?)"(?=\s*,\s*")', json_str, re.DOTALL)
-            if just_match:
-                recommendation["justification"] = just_match.group(1).strip()
-                
-            # Extract implementation - might contain newlines and code
-            impl_match = re.search(r'"implementation"\s*:\s*"(.*?)"(?=\s*,\s*")', json_str, re.DOTALL)
-            if impl_match:
-                recommendation["implementation"] = impl_match.group(1).strip()
-                
-            # Extract estimated savings percentage
-            savings_match = re.search(r'"estimated_savings_pct"\s*:\s*(\d+)', json_str)
-            if savings_match:
-                recommendation["estimated_savings_pct"] = int(savings_match.group(1))
-                
-            # Extract priority
-            priority_match = re.search(r'"priority"\s*:\s*"([^"]+)"', json_str)
-            if priority_match:
-                recommendation["priority"] = priority_match.group(1).strip()
+            # Scan once, keeping the first value found for each field
+            extracted = {}
+            for match in _RECOMMENDATION_FIELD_RE.finditer(json_str):
+                field = _RECOMMENDATION_FIELDS[match.lastindex - 1]
+                if field not in extracted:
+                    extracted[field] = match.group(match.lastindex)
+            
+            for field, value in extracted.items():
+                if field == "estimated_savings_pct":
+                    recommendation[field] = int(value)
+                elif field in _INTERNED_FIELDS:
+                    recommendation[field] = sys.intern(value.strip())
+                else:
+                    recommendation[field] = value.strip()
             
             # Set table_id from referenced tables if available
             if referenced_tables and len(referenced_tables) > 0:
@@ -91,8 +136,7 @@ class LLMAnalyzer:
                 recommendation["table_id"] = "unknown_table"
                 
             # If we successfully extracted at least a few fields, return the recommendation
-            extracted_fields = sum(1 for m in [rec_type_match, rec_match, just_match, impl_match, savings_match, priority_match] if m)
-            if extracted_fields >= 2:  # At least two fields successfully extracted
+            if len(extracted) >= 2:  # At least two fields successfully extracted
                 return recommendation
                 
             return None
@@ -189,9 +233,8 @@ Format your response as a JSON object with the following structure:
                     json_str = llm_response[start_idx:end_idx]
                     
                     # Clean the JSON string to handle control characters and escape sequences
-                    import re
                     # Remove control characters
-                    json_str = re.sub(r'[\x00-\x1F\x7F]', '', json_str)
+                    json_str = json_str.translate(_CONTROL_CHARS)
                     # Fix escaped quotes and backslashes
                     json_str = json_str.replace('\\"', '"').replace('\\\\', '\\')
                     
@@ -201,14 +244,18 @@ Format your response as a JSON object with the following structure:
                         # Try different approaches to fix JSON
                         logger.warning(f"Initial JSON parsing failed: {e}")
                         
-                        # Try fixing common JSON issues
-                        if "control character" in str(e):
+                        # Try fixing common JSON issues, cheapest first
+                        repaired = _repair_json(json_str)
+                        if repaired:
+                            recommendation = repaired
+                            logger.info("JSON parsing succeeded after repair")
+                        elif "control character" in str(e):
                             # More aggressive cleanup for control characters
-                            cleaned_json = ''.join(ch for ch in json_str if ord(ch) >= 32 or ch == '\n')
+                            cleaned_json = json_str.translate(_CONTROL_CHARS_EXCEPT_NEWLINE)
                             try:
                                 recommendation = json.loads(cleaned_json)
                                 logger.info("JSON parsing succeeded after control character cleanup")
-                            except:
+                            except json.JSONDecodeError:
                                 logger.warning("JSON parsing failed after control character cleanup")
                                 
                                 # Try manual extraction as a last resort
@@ -291,9 +338,8 @@ Format your response as a JSON object with the following structure:
                             # Handle quoted and unquoted formats
                             if "'" in tables_str or '"' in tables_str:
                                 # With quotes - handle properly
-                                import re
                                 # Match strings inside quotes
-                                matches = re.findall(r'[\'"]([^\'"]*)[\'"]', tables_str)
+                                matches = _QUOTED_RE.findall(tables_str)
                                 referenced_tables = [table.strip() for table in matches if table.strip()]
                             else:
                                 # No quotes - simple split
@@ -313,15 +359,12 @@ Format your response as a JSON object with the following structure:
             if not referenced_tables and query.get('query_text'):
                 try:
                     # Simple regex pattern to extract table names from common SQL patterns
-                    import re
-                    # Look for FROM, JOIN patterns
+                    # Look for FROM, JOIN patterns; \s+ already spans newlines
                     sql = query['query_text'].upper()
-                    # Replace all newlines and extra whitespace
-                    sql = re.sub(r'\s+', ' ', sql)
                     
                     # Common patterns: FROM table, JOIN table, FROM project.dataset.table
-                    from_matches = re.findall(r'FROM\s+([^\s,;()]+)', sql)
-                    join_matches = re.findall(r'JOIN\s+([^\s,;()]+)', sql)
+                    from_matches = _FROM_TABLE_RE.findall(sql)
+                    join_matches = _JOIN_TABLE_RE.findall(sql)
                     
                     # Combine and clean up
                     extracted_tables = []
@@ -6,13 +6,17 @@ Entry point for the BigQuery Optimizer application.
 
 import os
 import sys
+import heapq
 import logging
 import argparse
+from collections import Counter
+from csv import DictReader
+from dataclasses import replace
 from typing import List, Dict, Any
 
-from bigquery_optimizer.utils.config import load_config
+from bigquery_optimizer.utils.config import Config, load_config
 from bigquery_optimizer.analysis.metadata_collector import collect_table_metadata, collect_query_history, save_to_csv
-from bigquery_optimizer.analysis.heuristic_analyzer import HeuristicAnalyzer
+from bigquery_optimizer.analysis.heuristic_analyzer import HeuristicAnalyzer, recommendation_sort_key
 from bigquery_optimizer.vectordb.quadrant_manager import QuadrantManager
 from bigquery_optimizer.llm_analyzer import LLMAnalyzer
 
@@ -61,34 +65,27 @@ def summarize_recommendations(recommendations: List[Dict[str, Any]], output_file
         logger.info("No recommendations to summarize")
         return
 
-    # Group by table and type
-    by_table = {}
-    by_type = {}
+    # Count by table and type; only the top tables need their records grouped
+    table_counts = Counter(rec["table_id"] for rec in recommendations)
+    type_counts = Counter(rec["recommendation_type"] for rec in recommendations)
 
+    top_tables = table_counts.most_common(10)
+    by_table = {table_id: [] for table_id, _ in top_tables}
     for rec in recommendations:
-        table_id = rec["table_id"]
-        rec_type = rec["recommendation_type"]
-
-        if table_id not in by_table:
-            by_table[table_id] = []
-        by_table[table_id].append(rec)
-
-        if rec_type not in by_type:
-            by_type[rec_type] = []
-        by_type[rec_type].append(rec)
+        recs = by_table.get(rec["table_id"])
+        if recs is not None:
+            recs.append(rec)
 
     # Print summary
     print("\n===== BigQuery Optimization Recommendations =====\n")
 
     print(f"Total recommendations: {len(recommendations)}")
     print("\nRecommendations by type:")
-    for rec_type, recs in by_type.items():
-        print(f"  {rec_type}: {len(recs)}")
+    for rec_type, count in type_counts.items():
+        print(f"  {rec_type}: {count}")
 
     print("\nRecommendations by table (top 10):")
-    for i, (table_id, recs) in enumerate(sorted(by_table.items(), key=lambda x: len(x[1]), reverse=True)):
-        if i >= 10:
-            break
+    for table_id, recs in by_table.items():
         print(f"\n{table_id}: {len(recs)} recommendations")
         for rec in recs[:3]:  # Show only top 3 recommendations per table
             print(f"  - {rec['recommendation_type']}: {rec['recommendation']} (Est. savings: {rec['estimated_savings_pct']}%, Priority: {rec['priority']})")
@@ -97,9 +94,7 @@ def summarize_recommendations(recommendations: List[Dict[str, Any]], output_file
 
     print("\nTop 5 highest-priority recommendations:")
     # Sort by priority and estimated savings
-    top_recs = sorted(recommendations,
-                     key=lambda x: (-{"HIGH": 3, "MEDIUM": 2, "LOW": 1}.get(x.get("priority", "LOW"), 0),
-                                   -x.get("estimated_savings_pct", 0)))[:5]
+    top_recs = heapq.nsmallest(5, recommendations, key=recommendation_sort_key)
     for i, rec in enumerate(top_recs):
         print(f"\n{i+1}. {rec['recommendation_type']}: {rec['recommendation']}")
         print(f"   Table: {rec['table_id']}")
@@ -109,7 +104,7 @@ def summarize_recommendations(recommendations: List[Dict[str, Any]], output_file
 
     print(f"\nFull recommendations saved to {output_file}")
 
-def run(config: Dict[str, Any]) -> None:
+def run(config: Config) -> None:
     """
     Run the BigQuery Optimizer
 
@@ -117,18 +112,18 @@ def run(config: Dict[str, Any]) -> None:
         config: Application configuration
     """
     logger.info("Starting BigQuery Optimizer")
-    logger.info(f"Project: {config['project_id']}")
-    logger.info(f"Lookback days: {config['lookback_days']}")
-    logger.info(f"Use LLM: {config['use_llm']}")
+    logger.info("Project: %s", config.project_id)
+    logger.info("Lookback days: %s", config.lookback_days)
+    logger.info("Use LLM: %s", config.use_llm)
 
     table_metadata = []
     query_history = []
-    output_file = config.get('output_recommendations_file', 'query_recommendations.csv')
+    output_file = config.output_recommendations_file
 
     # Parse command line arguments for optional steps
-    collect_metadata = config.get('collect_metadata', True)
-    collect_queries = config.get('collect_queries', True)
-    use_vector_db = config.get('use_vector_db', True) and config['use_llm']
+    collect_metadata = config.collect_metadata
+    collect_queries = config.collect_queries
+    use_vector_db = config.use_vector_db and config.use_llm
 
     # Step 1: Collect table metadata (if enabled)
     if collect_metadata:
@@ -138,27 +133,25 @@ def run(config: Dict[str, Any]) -> None:
             logger.warning("No table metadata collected, using existing metadata if available.")
             # Try to load existing metadata from file if it exists
             try:
-                from csv import DictReader
-                existing_metadata_file = config.get('output_metadata_file', 'table_metadata.csv')
+                existing_metadata_file = config.output_metadata_file
                 if os.path.exists(existing_metadata_file):
                     with open(existing_metadata_file, 'r') as f:
                         table_metadata = list(DictReader(f))
-                    logger.info(f"Loaded {len(table_metadata)} table metadata records from {existing_metadata_file}")
+                    logger.info("Loaded %d table metadata records from %s", len(table_metadata), existing_metadata_file)
             except Exception as e:
-                logger.warning(f"Failed to load existing metadata: {e}")
+                logger.warning("Failed to load existing metadata: %s", e)
                 table_metadata = []
     else:
         logger.info("Skipping metadata collection (disabled in config)")
         # Try to load existing metadata from file if it exists
         try:
-            from csv import DictReader
-            existing_metadata_file = config.get('output_metadata_file', 'table_metadata.csv')
+            existing_metadata_file = config.output_metadata_file
             if os.path.exists(existing_metadata_file):
                 with open(existing_metadata_file, 'r') as f:
                     table_metadata = list(DictReader(f))
-                logger.info(f"Loaded {len(table_metadata)} table metadata records from {existing_metadata_file}")
+                logger.info("Loaded %d table metadata records from %s", len(table_metadata), existing_metadata_file)
         except Exception as e:
-            logger.warning(f"Failed to load existing metadata: {e}")
+            logger.warning("Failed to load existing metadata: %s", e)
 
     # Step 2: Collect query history (if enabled)
     if collect_queries:
@@ -170,14 +163,13 @@ def run(config: Dict[str, Any]) -> None:
         logger.info("Skipping query history collection (disabled in config)")
         # Try to load existing query history from file if it exists
         try:
-            from csv import DictReader
-            existing_queries_file = config.get('output_queries_file', 'query_history.csv')
+            existing_queries_file = config.output_queries_file
             if os.path.exists(existing_queries_file):
                 with open(existing_queries_file, 'r') as f:
                     query_history = list(DictReader(f))
-                logger.info(f"Loaded {len(query_history)} query history records from {existing_queries_file}")
+                logger.info("Loaded %d query history records from %s", len(query_history), existing_queries_file)
         except Exception as e:
-            logger.warning(f"Failed to load existing query history: {e}")
+            logger.warning("Failed to load existing query history: %s", e)
 
     # Initialize recommendations list
     all_recommendations = []
@@ -188,47 +180,50 @@ def run(config: Dict[str, Any]) -> None:
         heuristic_analyzer = HeuristicAnalyzer(config)
         heuristic_recommendations = heuristic_analyzer.analyze_data(table_metadata, query_history)
         all_recommendations.extend(heuristic_recommendations)
-        logger.info(f"Generated {len(heuristic_recommendations)} heuristic recommendations")
+        logger.info("Generated %d heuristic recommendations", len(heuristic_recommendations))
     else:
         logger.warning("Skipping heuristic analysis due to missing table metadata")
 
     # Step 4: LLM-based analysis (if enabled and we have both metadata and queries)
-    if config['use_llm'] and table_metadata and query_history:
+    if config.use_llm and table_metadata and query_history:
         # Only initialize vector DB if explicitly enabled
-        if use_vector_db:
-            logger.info("Step 4: Setting up vector database")
-            quadrant_manager = QuadrantManager(config)
-            vector_db_ready = quadrant_manager.initialize_collection()
-
-            if vector_db_ready:
-                # Store schemas in vector database
-                store_success = quadrant_manager.store_schemas(table_metadata)
-                if not store_success:
-                    logger.warning("Failed to store schemas in vector database, but continuing with analysis")
+        quadrant_manager = QuadrantManager(config) if use_vector_db else None
+        try:
+            schema_manager = None
+            if quadrant_manager:
+                logger.info("Step 4: Setting up vector database")
+                if quadrant_manager.initialize_collection():
+                    schema_manager = quadrant_manager
+                    # Store schemas in vector database
+                    store_success = quadrant_manager.store_schemas(table_metadata)
+                    if not store_success:
+                        logger.warning("Failed to store schemas in vector database, but continuing with analysis")
+                else:
+                    logger.warning("Vector database initialization failed, falling back to direct analysis")
             else:
-                logger.warning("Vector database initialization failed, falling back to direct analysis")
-                quadrant_manager = None
-        else:
-            logger.info("Skipping vector database setup (disabled in config)")
-            quadrant_manager = None
+                logger.info("Skipping vector database setup (disabled in config)")
 
-        # Analyze with LLM (with or without vector DB)
-        logger.info("Step 5: Performing LLM-based analysis")
-        llm_analyzer = LLMAnalyzer(config)
+            # Analyze with LLM (with or without vector DB)
+            logger.info("Step 5: Performing LLM-based analysis")
+            llm_analyzer = LLMAnalyzer(config)
 
-        # Limit the number of queries to analyze to avoid excessive API calls
-        query_limit = min(config.get('query_limit', 10), len(query_history))
-        limited_queries = query_history[:query_limit]
+            # Limit the number of queries to analyze to avoid excessive API calls
+            query_limit = min(config.query_limit, len(query_history))
+            limited_queries = query_history[:query_limit]
 
-        llm_recommendations = llm_analyzer.analyze_queries(limited_queries, quadrant_manager)
+            llm_recommendations = llm_analyzer.analyze_queries(limited_queries, schema_manager)
+        finally:
+            # Release the pooled session, workers and embedding store even if analysis fails
+            if quadrant_manager:
+                quadrant_manager.close()
         all_recommendations.extend(llm_recommendations)
-        logger.info(f"Generated {len(llm_recommendations)} LLM-based recommendations")
-    elif config['use_llm']:
+        logger.info("Generated %d LLM-based recommendations", len(llm_recommendations))
+    elif config.use_llm:
         logger.warning("Skipping LLM analysis due to missing data (requires both metadata and queries)")
 
     # Save all recommendations
     if all_recommendations:
-        logger.info(f"Saving {len(all_recommendations)} total recommendations")
+        logger.info("Saving %d total recommendations", len(all_recommendations))
         save_to_csv(all_recommendations, output_file)
 
         # Summarize recommendations
@@ -251,20 +246,25 @@ def main():
     config = load_config(args.config)
 
     # Override config with command line arguments
+    overrides = {}
     if args.project_id:
-        config['project_id'] = args.project_id
+        overrides['project_id'] = args.project_id
     if args.lookback_days:
-        config['lookback_days'] = args.lookback_days
+        overrides['lookback_days'] = args.lookback_days
     if args.no_llm:
-        config['use_llm'] = False
+        overrides['use_llm'] = False
     if args.output_file:
-        config['output_recommendations_file'] = args.output_file
+        overrides['output_recommendations_file'] = args.output_file
 
     # Set optional stage flags
-    config['collect_metadata'] = not args.skip_metadata
-    config['collect_queries'] = not args.skip_queries
-    config['use_vector_db'] = not args.skip_vector_db
-    config['query_limit'] = args.query_limit
+    config = replace(
+        config,
+        collect_metadata=not args.skip_metadata,
+        collect_queries=not args.skip_queries,
+        use_vector_db=not args.skip_vector_db,
+        query_limit=args.query_limit,
+        **overrides
+    )
 
     # Run the optimizer
     run(config)
@@ -7,61 +7,94 @@ Handles loading and managing configuration settings.
 import os
 import yaml
 import logging
-from typing import Dict, Any
+from dataclasses import dataclass, fields
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
-DEFAULT_CONFIG = {
+@dataclass(slots=True, frozen=True)
+class Config:
+    """
+    Application configuration
+
+    Immutable; use dataclasses.replace() to derive an overridden copy.
+    """
     # Project Settings
-    "project_id": "finops360-dev-2025",
-    "lookback_days": 30,
-    
+    project_id: str = "finops360-dev-2025"
+    lookback_days: int = 30
+    query_history_shards: int = 6  # Day-range shards queried concurrently
+    metadata_workers: int = 8  # Datasets fetched concurrently; also caps fallback get_table calls overall
+    list_page_size: int = 1000  # Results per page when listing datasets and tables
+
     # LLM Settings
-    "use_llm": True,
-    "ollama_endpoint": "http://127.0.0.1:11434/api/generate",
-    "ollama_model": "llama3",
-    "temperature": 0.2,
-    "max_tokens": 4096,
-    
+    use_llm: bool = True
+    ollama_endpoint: str = "http://127.0.0.1:11434/api/generate"
+    ollama_model: str = "llama3"
+    embedding_model: Optional[str] = None  # Opt-in Ollama embedding model; None uses summary-based embeddings
+    temperature: float = 0.2
+    max_tokens: int = 4096
+
     # Quadrant Settings
-    "quadrant_endpoint": "http://localhost:6333",
-    "quadrant_collection": "bigquery_schemas",
-    "vector_dimension": 768,
-    
+    quadrant_endpoint: str = "http://localhost:6333"
+    quadrant_collection: str = "bigquery_schemas"
+    vector_dimension: int = 768
+    embedding_cache_file: Optional[str] = None  # shelve file persisting embeddings across runs
+    embedding_workers: int = 8  # Concurrent embedding requests when storing schemas
+
     # Output Settings
-    "output_metadata_file": "table_metadata.csv",
-    "output_queries_file": "query_history.csv",
-    "output_recommendations_file": "query_recommendations.csv",
-    
+    output_metadata_file: str = "table_metadata.csv"
+    output_queries_file: str = "query_history.csv"
+    output_recommendations_file: str = "query_recommendations.csv"
+
     # Analysis Settings
-    "table_size_threshold": 0.01,  # GB, very low to include all tables
-    "min_query_count": 0,  # No minimum query count
-    "recommendation_limit": 100,  # Maximum recommendations to return
-}
+    table_size_threshold: float = 0.01  # GB, very low to include all tables
+    min_query_count: int = 0  # No minimum query count
+    recommendation_limit: int = 100  # Maximum recommendations to return
+
+    # Stage Settings (normally set from the command line)
+    collect_metadata: bool = True
+    collect_queries: bool = True
+    use_vector_db: bool = True
+    query_limit: int = 10  # Maximum number of queries to analyze with LLM
 
-def load_config(config_file: str = 'config.yaml') -> Dict[str, Any]:
+    def __post_init__(self):
+        """Fail fast on settings that would otherwise break a run part-way through"""
+        if not self.project_id:
+            raise ValueError("project_id must be set")
+        for name in ("lookback_days", "query_history_shards", "metadata_workers",
+                     "list_page_size", "vector_dimension", "embedding_workers"):
+            value = getattr(self, name)
+            if not isinstance(value, int) or value < 1:
+                raise ValueError(f"{name} must be a positive integer, got {value!r}")
+
+CONFIG_FIELDS = frozenset(f.name for f in fields(Config))
+
+def load_config(config_file: str = 'config.yaml') -> Config:
     """
     Load configuration from YAML file with fallback to defaults
-    
+
     Args:
         config_file: Path to YAML configuration file
-        
+
     Returns:
-        Dict containing configuration settings
+        Config containing configuration settings
     """
-    config = DEFAULT_CONFIG.copy()
-    
+    file_config = {}
+
     try:
         if os.path.exists(config_file):
             with open(config_file, 'r') as f:
-                file_config = yaml.safe_load(f)
-                if file_config:
-                    config.update(file_config)
+                file_config = yaml.safe_load(f) or {}
             logger.info(f"Loaded configuration from {config_file}")
         else:
             logger.warning(f"Config file {config_file} not found, using defaults")
     except Exception as e:
         logger.error(f"Error loading config from {config_file}: {e}")
         logger.info("Using default configuration")
-    
-    return config
\ No newline at end of file
+        file_config = {}
+
+    unknown_keys = sorted(set(file_config) - CONFIG_FIELDS)
+    if unknown_keys:
+        logger.warning(f"Ignoring unknown config keys in {config_file}: {', '.join(unknown_keys)}")
+
+    return Config(**{k: v for k, v in file_config.items() if k in CONFIG_FIELDS})
@@ -7,19 +7,74 @@ Provides integration with Quadrant vector database for schema storage and simila
 import json
 import logging
 import hashlib
-import struct
+import math
+import random
 import array
+import shelve
+import threading
+import uuid
+from functools import lru_cache
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from typing import List, Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Optional, Tuple
+from urllib3.util.retry import Retry
+
+from bigquery_optimizer.utils.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Compact separators drop a space per element, which adds up on vector payloads
+_JSON_ENCODER = json.JSONEncoder(separators=(',', ':'), allow_nan=False)
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+@lru_cache(maxsize=10000)
+def _table_id_to_uuid(table_id: str) -> str:
+    """
+    Map a table ID to the deterministic UUID used as its Quadrant point ID
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, table_id))
+
+_SCHEMA_FIELD_GETTER = itemgetter("name", "type", "mode")
+
+@lru_cache(maxsize=1024)
+def _schema_fields_text(schema_json: str) -> str:
+    """
+    Render a table's schema JSON as "- name (type, mode)" lines
+
+    Cached on the raw JSON, so tables sharing a schema (e.g. date-sharded
+    tables) are parsed and formatted only once.
+    """
+    return "".join(
+        "- %s (%s, %s)\n" % _SCHEMA_FIELD_GETTER(field)
+        for field in json.loads(schema_json)
+    )
+
 class QuadrantManager:
     """
     Manages interaction with Quadrant vector database
     """
     
-    def __init__(self, config: Dict[str, Any]):
+    # Maximum number of points sent in a single upsert request
+    UPSERT_BATCH_SIZE = 128
+    # Payload fields returned by lookups; the stored table metadata and the
+    # vector are left on the server since query analysis never reads them
+    SCHEMA_PAYLOAD_FIELDS = ["table_id", "point_id", "schema_text", "embedding_scheme"]
+    # Recorded with each point so vectors from different embedding methods,
+    # which are not comparable, are never mistaken for current ones
+    HASH_EMBEDDING_SCHEME = "hash-v2"
+    FAILED_EMBEDDING_SCHEME = "none"
+    # Cached embeddings are stored as int8 components, scaled per vector so the
+    # largest component maps to this value
+    EMBEDDING_QUANT_LEVELS = 127
+    # (connect, read) timeouts in seconds; Ollama generation gets a longer read timeout
+    HTTP_TIMEOUT = (3.05, 30)
+    OLLAMA_TIMEOUT = (3.05, 120)
+    # Consecutive Ollama failures after which embeddings go straight to the hash fallback
+    OLLAMA_FAILURE_LIMIT = 3
+    
+    def __init__(self, config: Config):
         """
         Initialize Quadrant manager with the provided configuration
         
@@ -27,11 +82,156 @@ class QuadrantManager:
             config: Application configuration
         """
         self.config = config
-        self.endpoint = config['quadrant_endpoint']
-        self.collection = config['quadrant_collection']
-        self.vector_dim = config['vector_dimension']
-        self.ollama_endpoint = config['ollama_endpoint']
-        self.ollama_model = config['ollama_model']
+        self.endpoint = config.quadrant_endpoint
+        self.collection = config.quadrant_collection
+        self.vector_dim = config.vector_dimension
+        self.ollama_endpoint = config.ollama_endpoint
+        self.ollama_model = config.ollama_model
+        self.embedding_model = config.embedding_model
+        self.native_embedding_scheme = f"native:{config.embedding_model}"
+        self.summary_embedding_scheme = f"summary-v2:{config.ollama_model}"
+        # Ollama's native embeddings endpoint, on the same server as generation
+        base, sep, _ = config.ollama_endpoint.rpartition("/api/")
+        self.ollama_embed_endpoint = f"{base}/api/embed" if sep else None
+        self.embedding_workers = max(1, config.embedding_workers)
+        self.session = self._create_session(f"{base}/api/" if sep else config.ollama_endpoint)
+        self._collection_ready = False
+        # Runs query embeddings alongside schema lookups in get_relevant_schemas
+        self._query_executor = ThreadPoolExecutor(max_workers=1)
+        self._ollama_failures = 0
+        # Cleared for the rest of the run once /api/embed proves unusable
+        self._native_embeddings = bool(self.embedding_model and self.ollama_embed_endpoint)
+        self._native_embeddings_probed = False
+        # Schema payloads by table ID, filled from lookups and successful
+        # upserts so repeated lookups during query analysis stay in-process
+        self._schema_index: Dict[str, Dict[str, Any]] = {}
+        
+        # Content-addressed cache of Ollama-derived embeddings, optionally
+        # backed by a shelve file so vectors survive across runs
+        self._embedding_cache: Dict[str, Tuple[float, array.array]] = {}
+        self._embedding_cache_lock = threading.Lock()
+        self._embedding_store = shelve.open(config.embedding_cache_file) if config.embedding_cache_file else None
+    
+    @staticmethod
+    def _create_session(ollama_prefix: Optional[str] = None) -> requests.Session:
+        """
+        Create a pooled HTTP session shared by all Quadrant and Ollama calls
+        
+        Args:
+            ollama_prefix: URL prefix of the Ollama API, mounted with its own
+                retry policy (skipped if empty)
+        
+        Returns:
+            requests.Session: Session with keep-alive connection pooling and retries
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.2,
+                status_forcelist=[502, 503, 504],
+                # Upserts use deterministic point IDs, so PUT/POST are safe to retry
+                allowed_methods=frozenset(["GET", "PUT", "POST"])
+            )
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        
+        if ollama_prefix:
+            # A read timeout on Ollama means a generation that already ran for
+            # OLLAMA_TIMEOUT; re-sending it would multiply the stall, so only
+            # connection errors and gateway statuses are retried
+            session.mount(ollama_prefix, HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=32,
+                max_retries=Retry(
+                    total=3,
+                    read=0,
+                    backoff_factor=0.2,
+                    status_forcelist=[502, 503, 504],
+                    allowed_methods=frozenset(["POST"])
+                )
+            ))
+        return session
+    
+    def close(self) -> None:
+        """Close the underlying HTTP session, the query worker and the persistent embedding cache"""
+        self._query_executor.shutdown(wait=True)
+        self.session.close()
+        if self._embedding_store is not None:
+            with self._embedding_cache_lock:
+                self._embedding_store.close()
+                self._embedding_store = None
+    
+    def __enter__(self) -> "QuadrantManager":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
+    def _send_json(self, method: str, url: str, body: Dict[str, Any],
+                   timeout: Optional[tuple] = None) -> requests.Response:
+        """
+        Send a request with a compactly encoded JSON body over the shared session
+        
+        Args:
+            method: HTTP method
+            url: Request URL
+            body: JSON-serializable request body
+            timeout: (connect, read) timeout in seconds (defaults to HTTP_TIMEOUT)
+            
+        Returns:
+            requests.Response: The response
+        """
+        return self.session.request(
+            method,
+            url,
+            data=_JSON_ENCODER.encode(body).encode('utf-8'),
+            headers=_JSON_HEADERS,
+            timeout=timeout or self.HTTP_TIMEOUT
+        )
+    
+    def _record_ollama_result(self, success: bool) -> None:
+        """
+        Track consecutive Ollama failures for the embedding circuit breaker
+        
+        Args:
+            success: Whether the last Ollama call succeeded
+        """
+        if success:
+            self._ollama_failures = 0
+            return
+        
+        self._ollama_failures += 1
+        if self._ollama_failures == self.OLLAMA_FAILURE_LIMIT:
+            logger.warning(f"Ollama failed {self._ollama_failures} times in a row, "
+                           "using hash-based embeddings for the remaining texts")
+    
+    def _preferred_embedding_scheme(self) -> str:
+        """
+        Embedding scheme this run produces when Ollama is healthy
+        
+        The first call probes /api/embed once, so a server without the
+        embedding model settles on summary-based embeddings before stored
+        points are compared against the scheme.
+        
+        Returns:
+            str: The native, summary or hash scheme tag
+        """
+        if self._native_embeddings and not self._native_embeddings_probed:
+            self._native_embeddings_probed = True
+            try:
+                self._native_embedding("embedding probe")
+            except (requests.RequestException, ValueError) as e:
+                logger.warning(f"Ollama embedding probe failed: {e}")
+        
+        if self._native_embeddings:
+            return self.native_embedding_scheme
+        if self.ollama_endpoint:
+            return self.summary_embedding_scheme
+        return self.HASH_EMBEDDING_SCHEME
     
     def initialize_collection(self) -> bool:
         """
@@ -40,24 +240,27 @@ class QuadrantManager:
         Returns:
             bool: Success status
         """
+        if self._collection_ready:
+            return True
+        
         logger.info(f"Initializing Quadrant collection: {self.collection}")
         
         try:
-            # Check if collection exists
-            resp = requests.get(f"{self.endpoint}/collections")
-            if resp.status_code != 200:
+            # Check if collection exists with a direct lookup (404 if missing)
+            resp = self.session.get(f"{self.endpoint}/collections/{self.collection}", timeout=self.HTTP_TIMEOUT)
+            if resp.status_code not in (200, 404):
                 logger.error(f"Failed to connect to Quadrant at {self.endpoint}")
                 return False
                 
-            collections = resp.json().get('result', {}).get('collections', [])
-            collection_exists = any(c.get('name') == self.collection for c in collections)
+            collection_exists = resp.status_code == 200
             
             # Create collection if it doesn't exist
             if not collection_exists:
                 logger.info(f"Creating new collection: {self.collection}")
-                create_resp = requests.put(
+                create_resp = self._send_json(
+                    "PUT",
                     f"{self.endpoint}/collections/{self.collection}",
-                    json={
+                    {
                         "vectors": {
                             "size": self.vector_dim,
                             "distance": "Cosine"
@@ -73,6 +276,7 @@ class QuadrantManager:
             else:
                 logger.info(f"Collection {self.collection} already exists")
                 
+            self._collection_ready = True
             return True
             
         except Exception as e:
@@ -83,6 +287,14 @@ class QuadrantManager:
         """
         Store schema information in Quadrant
         
+        Tables whose stored schema text is unchanged and whose vector was made
+        by the embedding scheme this run prefers are skipped, since their point
+        is already current; points embedded another way (e.g. hash fallbacks
+        from an Ollama outage) are re-embedded. Embeddings for the rest are generated
+        concurrently and each full chunk of points is upserted on a background
+        thread as soon as it is ready, so writes to Quadrant overlap with the
+        remaining embedding requests.
+        
         Args:
             table_metadata: List of table metadata dictionaries
             
@@ -92,60 +304,111 @@ class QuadrantManager:
         logger.info(f"Storing {len(table_metadata)} schemas in Quadrant")
         
         try:
-            points = []
+            schema_texts = []
             
             for table in table_metadata:
                 # Create a text representation of the schema
                 table_id = table['table_id']
-                schema_text = f"Table: {table_id}\n"
-                schema_text += f"Size: {table['size_gb']:.2f} GB\n"
-                schema_text += f"Rows: {table['row_count']}\n"
-                schema_text += f"Partitioned: {table['is_partitioned']}\n"
-                schema_text += f"Clustered: {table['is_clustered']}\n\n"
-                schema_text += "Schema:\n"
-                
                 try:
-                    schema = json.loads(table['schema'])
-                    for field in schema:
-                        schema_text += f"- {field['name']} ({field['type']}, {field['mode']})\n"
-                except:
-                    schema_text += "[Schema parsing error]\n"
-                    
-                # Generate embedding
-                embedding = self.generate_embedding(schema_text)
-                if not embedding:
-                    logger.warning(f"Failed to generate embedding for {table_id}")
-                    continue
-                    
-                # Create point - use UUID for point ID to meet Quadrant requirements
-                import uuid
-                # Generate a deterministic UUID based on table_id
-                point_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, table_id))
+                    fields_text = _schema_fields_text(table['schema'])
+                except (ValueError, TypeError, KeyError):
+                    # Malformed JSON, a non-string schema or a field missing a key
+                    fields_text = "[Schema parsing error]\n"
+                
+                schema_texts.append(
+                    f"Table: {table_id}\n"
+                    f"Size: {table['size_gb']:.2f} GB\n"
+                    f"Rows: {table['row_count']}\n"
+                    f"Partitioned: {table['is_partitioned']}\n"
+                    f"Clustered: {table['is_clustered']}\n\n"
+                    f"Schema:\n{fields_text}"
+                )
+            
+            # One batch lookup tells us which points are already up to date,
+            # sparing their embedding (an Ollama round-trip) and upsert
+            stored = self.get_schemas_by_table_ids([table['table_id'] for table in table_metadata])
+            scheme = self._preferred_embedding_scheme()
+            pending = [
+                (table, schema_text)
+                for table, schema_text in zip(table_metadata, schema_texts)
+                if stored.get(table['table_id'], {}).get("schema_text") != schema_text
+                or stored[table['table_id']].get("embedding_scheme") != scheme
+            ]
+            
+            # Stored payloads for changed tables are stale until re-upserted
+            for table, _ in pending:
+                self._schema_index.pop(table['table_id'], None)
+            
+            unchanged = len(table_metadata) - len(pending)
+            if unchanged:
+                logger.info(f"Skipping {unchanged} schemas already stored unchanged in Quadrant")
+                if not pending:
+                    return True
+            
+            points = []
+            point_count = 0
+            upserts = []
+            stored_payloads = []
+            
+            embed_workers = max(1, min(self.embedding_workers, len(pending)))
+            with ThreadPoolExecutor(max_workers=embed_workers) as embed_pool, \
+                    ThreadPoolExecutor(max_workers=1) as upsert_pool:
+                # map() yields embeddings in order as they complete
+                embeddings = embed_pool.map(
+                    self._generate_embedding_with_scheme, [schema_text for _, schema_text in pending]
+                )
+                
+                for (table, schema_text), (embedding, scheme) in zip(pending, embeddings):
+                    table_id = table['table_id']
+                    if not embedding:
+                        logger.warning(f"Failed to generate embedding for {table_id}")
+                        continue
+                        
+                    # Create point - use a deterministic UUID to meet Quadrant requirements
+                    point_uuid = _table_id_to_uuid(table_id)
 
-                points.append({
-                    "id": point_uuid,  # Use UUID format which is accepted by Quadrant
-                    "vector": embedding,
-                    "payload": {
+                    points.append({
+                        "id": point_uuid,  # Use UUID format which is accepted by Quadrant
+                        "vector": embedding,
+                        "payload": {
+                            "table_id": table_id,
+                            "point_id": point_uuid,  # Store the ID for reference
+                            "schema_text": schema_text,
+                            "embedding_scheme": scheme,
+                            "metadata": table
+                        }
+                    })
+                    
+                    stored_payloads.append({
                         "table_id": table_id,
-                        "point_id": point_uuid,  # Store the ID for reference
+                        "point_id": point_uuid,
                         "schema_text": schema_text,
-                        "metadata": table
-                    }
-                })
+                        "embedding_scheme": scheme
+                    })
+                    
+                    # Hand off each full chunk while embedding continues
+                    if len(points) >= self.UPSERT_BATCH_SIZE:
+                        upserts.append(upsert_pool.submit(self._upsert_batch, points))
+                        point_count += len(points)
+                        points = []
                 
-            # Store points in batches
-            if points:
-                logger.info(f"Storing {len(points)} points in Quadrant")
-                resp = requests.put(
-                    f"{self.endpoint}/collections/{self.collection}/points",
-                    json={"points": points}
-                )
+                if points:
+                    upserts.append(upsert_pool.submit(self._upsert_batch, points))
+                    point_count += len(points)
+                
+                upsert_results = [future.result() for future in upserts]
                 
-                if resp.status_code not in (200, 201):
-                    logger.error(f"Failed to store points: {resp.text}")
+            # Report on the stored batches
+            if point_count:
+                logger.info(f"Stored {point_count} points in Quadrant in {len(upserts)} batches")
+                if not all(upsert_results):
                     return False
+                
+                self._schema_index.update(
+                    (payload["table_id"], payload) for payload in stored_payloads
+                )
                     
-                logger.info(f"Successfully stored {len(points)} schema points in Quadrant")
+                logger.info(f"Successfully stored {point_count} schema points in Quadrant")
                 return True
             else:
                 logger.warning("No points to store in Quadrant")
@@ -155,11 +418,241 @@ class QuadrantManager:
             logger.error(f"Error storing schemas in Quadrant: {e}")
             return False
     
+    def _upsert_batch(self, points: List[Dict[str, Any]], batch_size: Optional[int] = None) -> bool:
+        """
+        Upsert points into the collection in fixed-size chunks
+        
+        Keeps each request body bounded to batch_size points instead of
+        serializing every vector into a single payload. If a chunk is
+        rejected, its points are retried one at a time so a single bad point
+        does not drop the rest of the chunk.
+        
+        Args:
+            points: Points to upsert
+            batch_size: Points per request (defaults to UPSERT_BATCH_SIZE)
+            
+        Returns:
+            bool: True if every point was stored
+        """
+        batch_size = batch_size or self.UPSERT_BATCH_SIZE
+        success = True
+        
+        for i in range(0, len(points), batch_size):
+            chunk = points[i:i + batch_size]
+            if self._upsert_points(chunk):
+                continue
+            
+            logger.warning(f"Upsert of {len(chunk)} points failed, retrying them individually")
+            failed = [point for point in chunk if len(chunk) == 1 or not self._upsert_points([point])]
+            if failed:
+                logger.error(f"Failed to store {len(failed)} points: "
+                             f"{[point['payload'].get('table_id') for point in failed]}")
+                success = False
+        
+        return success
+    
+    def _upsert_points(self, points: List[Dict[str, Any]]) -> bool:
+        """
+        Upsert points in a single request
+        
+        Args:
+            points: Points to upsert
+            
+        Returns:
+            bool: True if the request succeeded
+        """
+        resp = self._send_json(
+            "PUT",
+            f"{self.endpoint}/collections/{self.collection}/points",
+            {"points": points}
+        )
+        
+        if resp.status_code not in (200, 201):
+            logger.error(f"Failed to store points: {resp.text}")
+            return False
+        return True
+    
+    def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embedding vectors for several texts concurrently
+        
+        Requests are issued from a bounded thread pool over the shared
+        session, so N texts cost roughly N / embedding_workers round-trips.
+        
+        Args:
+            texts: Texts to generate embeddings for
+            
+        Returns:
+            List[List[float]]: Embedding vectors, in the same order as texts
+        """
+        if not texts:
+            return []
+        
+        with ThreadPoolExecutor(max_workers=min(self.embedding_workers, len(texts))) as executor:
+            return list(executor.map(self.generate_embedding, texts))
+    
+    def _embedding_cache_key(self, text_bytes: bytes, native: bool) -> str:
+        """
+        Build the cache key for text: a BLAKE2b digest of storage format,
+        embedding scheme, model, dimension and text
+        
+        Args:
+            text_bytes: UTF-8 encoded text being embedded
+            native: Whether the key is for a native (embedding model) vector
+            
+        Returns:
+            str: Hex digest identifying the embedding
+        """
+        if native:
+            scheme = f"embed\x00{self.embedding_model}"
+        else:
+            scheme = f"b2prng\x00{self.ollama_model}"
+        key_hash = hashlib.blake2b(
+            f"i8s\x00{scheme}\x00{self.vector_dim}\x00".encode(), digest_size=16
+        )
+        key_hash.update(text_bytes)
+        return key_hash.hexdigest()
+    
+    def _get_cached_embedding(self, key: str) -> Optional[List[float]]:
+        """
+        Look up an embedding in the in-memory cache, then the persistent store
+        
+        Args:
+            key: Cache key from _embedding_cache_key
+            
+        Returns:
+            List[float] if cached, otherwise None
+        """
+        entry = self._embedding_cache.get(key)
+        if entry is None and self._embedding_store is not None:
+            with self._embedding_cache_lock:
+                entry = self._embedding_store.get(key)
+            if entry is not None:
+                self._embedding_cache[key] = entry
+        if entry is None:
+            return None
+        return self._dequantize_embedding(*entry)
+    
+    @staticmethod
+    def _dequantize_embedding(scale: float, vector: array.array) -> List[float]:
+        """
+        Rebuild a unit-length embedding from its int8 components
+        
+        Args:
+            scale: Factor the components were multiplied by before rounding
+            vector: int8 components
+            
+        Returns:
+            List[float]: Normalized embedding vector
+        """
+        embedding = [v / scale for v in vector]
+        magnitude = math.hypot(*embedding)
+        if magnitude > 0:
+            embedding = [x / magnitude for x in embedding]
+        return embedding
+    
+    def _cache_embedding(self, key: str, embedding: List[float]) -> List[float]:
+        """
+        Store an embedding as a compact int8 array in the cache
+        
+        Each vector is scaled so its largest component maps to
+        EMBEDDING_QUANT_LEVELS, keeping the full int8 range for the small
+        components of high-dimensional unit vectors; the scale is stored with
+        the array. Callers use the returned round-tripped vector, so a text
+        gets the same embedding whether or not the cache was warm.
+        
+        Args:
+            key: Cache key from _embedding_cache_key
+            embedding: Normalized embedding vector to cache
+            
+        Returns:
+            List[float]: The normalized vector as it will be read back from the cache
+        """
+        largest = max(map(abs, embedding), default=0.0)
+        scale = self.EMBEDDING_QUANT_LEVELS / largest if largest > 0 else 1.0
+        entry = (scale, array.array('b', [round(x * scale) for x in embedding]))
+        self._embedding_cache[key] = entry
+        if self._embedding_store is not None:
+            with self._embedding_cache_lock:
+                self._embedding_store[key] = entry
+        return self._dequantize_embedding(*entry)
+    
+    def _hash_to_embedding(self, digest: bytes) -> List[float]:
+        """
+        Expand a hash digest into a unit-length embedding vector
+        
+        The digest seeds a PRNG that draws one standard normal component per
+        dimension, so every dimension carries independent information (tiling
+        the digest repeated the same few dozen values across the vector). The
+        result is normalized with math.hypot.
+        
+        Args:
+            digest: Hash bytes to expand
+            
+        Returns:
+            List[float]: Normalized embedding vector of dimension vector_dim
+        """
+        rng = random.Random(int.from_bytes(digest, 'little'))
+        gauss = rng.gauss
+        embedding = [gauss(0.0, 1.0) for _ in range(self.vector_dim)]
+        
+        # Normalize the vector (important for cosine similarity)
+        magnitude = math.hypot(*embedding)
+        if magnitude > 0:
+            embedding = [x / magnitude for x in embedding]
+        return embedding
+    
+    def _native_embedding(self, text: str) -> Optional[List[float]]:
+        """
+        Get a normalized embedding from Ollama's /api/embed endpoint
+        
+        If the endpoint or model does not exist (a 404), or the model's
+        vectors do not match vector_dim, native
+        embeddings are disabled for the rest of the run. Any other error
+        status only fails this call and counts toward the Ollama circuit
+        breaker.
+        
+        Args:
+            text: Text to generate embedding for
+            
+        Returns:
+            List[float] if the endpoint returned a usable vector, otherwise None
+        """
+        response = self._send_json(
+            "POST",
+            self.ollama_embed_endpoint,
+            {"model": self.embedding_model, "input": text},
+            timeout=self.OLLAMA_TIMEOUT
+        )
+        if response.status_code != 200:
+            if response.status_code == 404:
+                self._native_embeddings = False
+                logger.warning(f"Ollama embeddings unavailable ({response.status_code} - {response.text}), "
+                               "using summary-based embeddings")
+            else:
+                self._record_ollama_result(False)
+                logger.warning(f"Ollama embedding request failed: {response.status_code} - {response.text}")
+            return None
+        
+        embeddings = response.json().get("embeddings") or [[]]
+        embedding = embeddings[0]
+        if len(embedding) != self.vector_dim:
+            self._native_embeddings = False
+            logger.warning(f"Embedding model {self.embedding_model} returned {len(embedding)} dimensions "
+                           f"instead of {self.vector_dim}, using summary-based embeddings")
+            return None
+        
+        magnitude = math.hypot(*embedding)
+        if magnitude > 0:
+            embedding = [x / magnitude for x in embedding]
+        return embedding
+    
     def generate_embedding(self, text: str) -> List[float]:
         """
         Generate embedding vector for text using Ollama or a fallback method
         
-        The function first tries to get embeddings from Ollama API. If that fails,
+        The function first tries Ollama's native embeddings endpoint, then an
+        embedding seeded by an Ollama summary of the text. If Ollama fails,
         it falls back to a deterministic hash-based approach.
         
         Args:
@@ -168,29 +661,71 @@ class QuadrantManager:
         Returns:
             List[float]: Embedding vector of dimension vector_dim
         """
+        return self._generate_embedding_with_scheme(text)[0]
+    
+    def _generate_embedding_with_scheme(self, text: str) -> Tuple[List[float], str]:
+        """
+        Generate an embedding as generate_embedding does, along with the
+        scheme that produced it
+        
+        Args:
+            text: Text to generate embedding for
+            
+        Returns:
+            Tuple[List[float], str]: Embedding vector and its embedding scheme
+        """
+        # Nothing to embed; skip the hashing and the Ollama round-trip
+        if not text or not text.strip():
+            return [0.0] * self.vector_dim, self.FAILED_EMBEDDING_SCHEME
+        
         try:
-            # Try calling Ollama for embeddings
-            if self.ollama_endpoint:
+            # Encode once; the cache key and both hash paths digest the same bytes
+            text_bytes = text.encode()
+            
+            # Reuse a previously generated Ollama embedding for identical text
+            native = self._native_embeddings
+            cache_key = self._embedding_cache_key(text_bytes, native)
+            cached = self._get_cached_embedding(cache_key)
+            if cached is not None:
+                return cached, self.native_embedding_scheme if native else self.summary_embedding_scheme
+            
+            # Try calling Ollama for embeddings, unless it has been failing
+            if self.ollama_endpoint and self._ollama_failures < self.OLLAMA_FAILURE_LIMIT:
                 try:
-                    # Your Ollama installation doesn't support embeddings via API
-                    # Instead, we'll use a text-based embedding approach
+                    # Prefer a real embedding from the embedding model
+                    if native:
+                        embedding = self._native_embedding(text)
+                        if embedding is not None:
+                            self._record_ollama_result(True)
+                            return self._cache_embedding(cache_key, embedding), self.native_embedding_scheme
+                        
+                        # No native vector for this text; look up the
+                        # summary-based embedding under its own cache key
+                        cache_key = self._embedding_cache_key(text_bytes, False)
+                        cached = self._get_cached_embedding(cache_key)
+                        if cached is not None:
+                            return cached, self.summary_embedding_scheme
 
-                    # First, let's get a short summary of the text from Ollama
+                    # Without an embedding model, use a text-based embedding approach:
+                    # first, let's get a short summary of the text from Ollama
                     # This will help create a more stable embedding
                     summary_prompt = f"Summarize this text in a few key points, focusing on the most important technical details:\n\n{text}"
 
-                    response = requests.post(
+                    response = self._send_json(
+                        "POST",
                         self.ollama_endpoint,
-                        json={
+                        {
                             "model": self.ollama_model,
                             "prompt": summary_prompt,
                             "stream": False,
                             "temperature": 0.1,  # Low temperature for consistent results
                             "num_predict": 256   # Short summary
-                        }
+                        },
+                        timeout=self.OLLAMA_TIMEOUT
                     )
 
                     # Check response
+                    self._record_ollama_result(response.status_code == 200)
                     if response.status_code == 200:
                         result = response.json()
 
@@ -198,66 +733,38 @@ class QuadrantManager:
                         summary = result.get("response", "")
 
                         if summary:
-                            # We'll use the summary to generate a deterministic embedding
-                            summary_hash = hashlib.md5(summary.encode()).digest()
-                            text_hash = hashlib.sha256(text.encode()).digest()
-
-                            # Combine both hashes for a more robust embedding
-                            combined_hash = summary_hash + text_hash
-
-                            # Convert to embedding
-                            embedding = []
-                            for i in range(self.vector_dim):
-                                # Use different parts of hash for each dimension
-                                pos = i % len(combined_hash)
-                                val = (combined_hash[pos] / 255.0) * 2.0 - 1.0  # Scale to [-1, 1]
-                                embedding.append(val)
-
-                            # Normalize
-                            magnitude = sum(x*x for x in embedding) ** 0.5
-                            if magnitude > 0:
-                                embedding = [x/magnitude for x in embedding]
+                            # We'll use the summary to generate a deterministic embedding,
+                            # seeded by one BLAKE2b pass over the summary and the text
+                            seed_hash = hashlib.blake2b(
+                                f"{summary}\x00".encode(), digest_size=64, usedforsecurity=False
+                            )
+                            seed_hash.update(text_bytes)
+                            embedding = self._hash_to_embedding(seed_hash.digest())
 
                             logger.info("Generated text-based LLM embedding")
-                            return embedding
+                            return self._cache_embedding(cache_key, embedding), self.summary_embedding_scheme
                         else:
                             logger.warning("No summary text returned from Ollama API")
                     else:
                         logger.warning(f"Failed to get embeddings from Ollama: {response.status_code} - {response.text}")
                 
                 except Exception as e:
+                    self._record_ollama_result(False)
                     logger.warning(f"Error getting embedding from Ollama: {e}, falling back to hash-based approach")
             
             # Fallback to deterministic hash-based approach
             logger.info("Using hash-based embedding generation as fallback")
             
-            # Create a deterministic embedding from hash of content
-            hash_obj = hashlib.sha256(text.encode())
-            hash_bytes = hash_obj.digest()
-            
-            # Convert hash to a list of float values between -1 and 1
-            # We need vector_dim values, so we may need to repeat the hash
-            embedding = []
-            
-            # Generate enough pseudo-random but deterministic values
-            for i in range(self.vector_dim):
-                # Use different parts of hash for each dimension
-                # to ensure variety while maintaining determinism
-                position = i % len(hash_bytes)
-                value = (hash_bytes[position] / 255.0) * 2.0 - 1.0  # Scale to [-1, 1]
-                embedding.append(value)
-            
-            # Normalize the vector (important for cosine similarity)
-            magnitude = sum(x*x for x in embedding) ** 0.5
-            if magnitude > 0:
-                embedding = [x/magnitude for x in embedding]
-                
-            return embedding
+            # Create a deterministic embedding from hash of content; the hash only
+            # seeds the vector, so a fast non-cryptographic use of BLAKE2b suffices
+            hash_bytes = hashlib.blake2b(text_bytes, digest_size=64, usedforsecurity=False).digest()
+            
+            return self._hash_to_embedding(hash_bytes), self.HASH_EMBEDDING_SCHEME
                 
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
             # Return a zero vector as fallback
-            return [0.0] * self.vector_dim
+            return [0.0] * self.vector_dim, self.FAILED_EMBEDDING_SCHEME
     
     def get_schema_by_table_id(self, table_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -267,71 +774,68 @@ class QuadrantManager:
             table_id: Table ID to retrieve
 
         Returns:
-            Dict containing schema information or None
+            Dict containing the schema payload fields (SCHEMA_PAYLOAD_FIELDS) or None
         """
-        try:
-            # Generate the same UUID as used when storing the point
-            import uuid
-            point_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, table_id))
+        schema = self.get_schemas_by_table_ids([table_id]).get(table_id)
+        if not schema:
+            logger.warning(f"No schema found for table {table_id}")
+        return schema
+    
+    def get_schemas_by_table_ids(self, table_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get schema information for several tables in a single request
 
-            # First try looking up by UUID point ID
-            resp = requests.post(
-                f"{self.endpoint}/collections/{self.collection}/points/scroll",
-                json={
-                    "filter": {
-                        "must": [
-                            {
-                                "key": "id",
-                                "match": {
-                                    "value": point_uuid
-                                }
-                            }
-                        ]
-                    },
-                    "limit": 1
-                }
-            )
-            
-            if resp.status_code != 200:
-                logger.error(f"Error retrieving schema by ID: {resp.text}")
-                return None
+        Points are retrieved directly by their deterministic UUIDs, which is
+        an indexed lookup rather than a filtered scroll. Tables already looked
+        up or stored by this manager are answered without a request.
 
-            points = resp.json().get("result", {}).get("points", [])
+        Args:
+            table_ids: Table IDs to retrieve
 
-            # If not found by ID, try searching by payload.table_id
-            if not points:
-                logger.info(f"Point not found by ID, trying payload search for {table_id}")
+        Returns:
+            Dict mapping each found table ID to its schema payload
+        """
+        if not table_ids:
+            return {}
 
-                # Search by payload.table_id field
-                payload_resp = requests.post(
-                    f"{self.endpoint}/collections/{self.collection}/points/scroll",
-                    json={
-                        "filter": {
-                            "must": [
-                                {
-                                    "key": "payload.table_id",
-                                    "match": {
-                                        "value": table_id
-                                    }
-                                }
-                            ]
-                        },
-                        "limit": 1
-                    }
-                )
+        # Serve tables already seen in this run from the in-process index
+        schema_index = self._schema_index
+        schemas = {table_id: schema_index[table_id] for table_id in table_ids if table_id in schema_index}
+        missing = [table_id for table_id in dict.fromkeys(table_ids) if table_id not in schemas]
+        if not missing:
+            return schemas
 
-                if payload_resp.status_code == 200:
-                    points = payload_resp.json().get("result", {}).get("points", [])
+        try:
+            # Generate the same UUIDs as used when storing the points
+            point_ids = [_table_id_to_uuid(table_id) for table_id in missing]
 
-            if not points:
-                logger.warning(f"No schema found for table {table_id}")
-                return None
+            resp = self._send_json(
+                "POST",
+                f"{self.endpoint}/collections/{self.collection}/points",
+                {
+                    "ids": point_ids,
+                    "with_payload": self.SCHEMA_PAYLOAD_FIELDS,
+                    "with_vector": False
+                }
+            )
+            
+            if resp.status_code != 200:
+                logger.error(f"Error retrieving schemas by ID: {resp.text}")
+                return schemas
 
-            return points[0].get("payload", {})
+            points = resp.json().get("result", [])
+            found = {
+                point["payload"]["table_id"]: point["payload"]
+                for point in points
+                if point.get("payload", {}).get("table_id")
+            }
+            schema_index.update(found)
+            schemas.update(found)
+            return schemas
             
         except Exception as e:
-            logger.error(f"Error retrieving schema: {e}")
-            return None
+            logger.error(f"Error retrieving schemas: {e}")
+            return schemas
     
     def get_relevant_schemas(self, query_text: str, table_ids: List[str]) -> List[Dict[str, Any]]:
         """
@@ -347,30 +851,44 @@ class QuadrantManager:
         schemas = []
 
         try:
-            # First, get the referenced tables
+            # First, get the referenced tables in one batch lookup
+            valid_table_ids = []
             for table_id in table_ids:
                 # Skip empty or invalid table IDs
                 if not table_id or table_id.strip() == "":
                     logger.warning("Skipping empty table ID")
                     continue
+                valid_table_ids.append(table_id)
+
+            # With fewer than 3 referenced tables the similarity search below is
+            # certain to run, so generate the query embedding alongside the lookup
+            has_query_text = bool(query_text and query_text.strip())
+            embedding_future = None
+            if has_query_text and len(set(valid_table_ids)) < 3:
+                embedding_future = self._query_executor.submit(self.generate_embedding, query_text)
 
-                logger.info(f"Looking up schema for table: {table_id}")
-                schema = self.get_schema_by_table_id(table_id)
-                if schema:
-                    schemas.append(schema)
+            logger.info(f"Looking up schemas for tables: {valid_table_ids}")
+            found = self.get_schemas_by_table_ids(valid_table_ids)
+            for table_id in dict.fromkeys(valid_table_ids):
+                if table_id in found:
+                    schemas.append(found[table_id])
+                else:
+                    logger.warning(f"No schema found for table {table_id}")
             
             # If no schemas found or we need more context, search by query similarity
-            if not schemas or len(schemas) < 3:
-                # Generate embedding for query
-                query_embedding = self.generate_embedding(query_text)
+            if len(schemas) < 3 and has_query_text:
+                # Generate embedding for query (unless already started above)
+                query_embedding = embedding_future.result() if embedding_future else self.generate_embedding(query_text)
                 if query_embedding:
                     # Search for similar schemas
-                    search_resp = requests.post(
+                    search_resp = self._send_json(
+                        "POST",
                         f"{self.endpoint}/collections/{self.collection}/points/search",
-                        json={
+                        {
                             "vector": query_embedding,
                             "limit": 3,
-                            "with_payload": True
+                            "with_payload": self.SCHEMA_PAYLOAD_FIELDS,
+                            "with_vector": False
                         }
                     )
                     
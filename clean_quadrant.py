@@ -7,6 +7,7 @@ This script helps reset the Quadrant vector database by deleting and recreating
 
 import argparse
 import requests
+from requests.adapters import HTTPAdapter
 import logging
 import sys
 
@@ -14,6 +15,12 @@ import sys
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
 logger = logging.getLogger(__name__)
 
+# Shared session so every call reuses one keep-alive connection to Quadrant
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=10, pool_maxsize=10)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
 def parse_args():
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(description="Clean and reset Quadrant collections")
@@ -33,7 +40,7 @@ def list_collections(endpoint):
     """List all collections in Quadrant"""
     try:
         logger.info(f"Listing collections at {endpoint}")
-        resp = requests.get(f"{endpoint}/collections")
+        resp = _SESSION.get(f"{endpoint}/collections")
         
         if resp.status_code == 200:
             collections = resp.json().get('result', {}).get('collections', [])
@@ -55,7 +62,7 @@ def delete_collection(endpoint, collection_name):
     """Delete a collection from Quadrant"""
     try:
         logger.info(f"Deleting collection: {collection_name}")
-        resp = requests.delete(f"{endpoint}/collections/{collection_name}")
+        resp = _SESSION.delete(f"{endpoint}/collections/{collection_name}")
         
         if resp.status_code == 200:
             logger.info(f"Successfully deleted collection: {collection_name}")
@@ -71,7 +78,7 @@ def create_collection(endpoint, collection_name, vector_dim):
     """Create a new collection in Quadrant"""
     try:
         logger.info(f"Creating collection: {collection_name}")
-        create_resp = requests.put(
+        create_resp = _SESSION.put(
             f"{endpoint}/collections/{collection_name}",
             json={
                 "vectors": {
@@ -98,7 +105,7 @@ def main():
     # Connect to Quadrant
     try:
         # Test connection
-        resp = requests.get(f"{args.endpoint}/collections")
+        resp = _SESSION.get(f"{args.endpoint}/collections")
         if resp.status_code != 200:
             logger.error(f"Failed to connect to Quadrant at {args.endpoint}")
             return 1
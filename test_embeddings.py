@@ -2,21 +2,50 @@
 """
 Test script for Ollama embedding generation
 
-This script tests the embedding generation approach implemented in QuadrantManager
-to ensure it works with the user's specific Ollama setup.
+This script mirrors the embedding generation in QuadrantManager (native /api/embed
+vectors, then Ollama summary-seeded vectors, then hash-seeded vectors) to check
+that it works with the user's specific Ollama setup.
 """
 
 import json
+import math
+import operator
+import random
 import requests
 import hashlib
 import logging
 import argparse
-from typing import List, Dict, Any
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Optional
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
 logger = logging.getLogger(__name__)
 
+# Shared session so every Ollama call reuses a keep-alive connection
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+# (connect, read) timeouts in seconds for Ollama generation
+OLLAMA_TIMEOUT = (3.05, 120)
+
+# Embeddings already generated in this run, keyed by a digest of endpoint,
+# embedding scheme, dimension and text; hash-only fallbacks use an empty endpoint.
+# Vectors are held as unboxed doubles in array('d') rather than float objects
+_EMBEDDING_CACHE: Dict[bytes, array] = {}
+
+# Same scheme tags QuadrantManager records with each stored point
+HASH_EMBEDDING_SCHEME = "hash-v2"
+
+def _embedding_cache_key(text_bytes: bytes, endpoint: str, scheme: str, vector_dim: int) -> bytes:
+    """Digest identifying an embedding of UTF-8 encoded text for the given settings"""
+    key_hash = hashlib.blake2b(f"{endpoint}\x00{scheme}\x00{vector_dim}\x00".encode(), digest_size=16)
+    key_hash.update(text_bytes)
+    return key_hash.digest()
+
 def parse_args():
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(description="Test Ollama embeddings generation")
@@ -24,21 +53,86 @@ def parse_args():
     parser.add_argument("--endpoint", default="http://127.0.0.1:11434/api/generate",
                       help="Ollama API endpoint (default: http://127.0.0.1:11434/api/generate)")
     parser.add_argument("--model", default="llama3",
-                      help="Ollama model to use (default: llama3)")
+                      help="Ollama model to use for summaries (default: llama3)")
+    parser.add_argument("--embedding-model", default="",
+                      help="Ollama embedding model for /api/embed, e.g. nomic-embed-text (default: none)")
     parser.add_argument("--vector-dim", type=int, default=768,
                       help="Embedding vector dimension (default: 768)")
     
     return parser.parse_args()
 
-def generate_embedding(text: str, endpoint: str, model: str, vector_dim: int) -> List[float]:
+def normalize(vector: List[float]) -> List[float]:
+    """Scale a vector to unit length with math.hypot (zero vectors are returned as is)"""
+    magnitude = math.hypot(*vector)
+    if magnitude > 0:
+        return [x / magnitude for x in vector]
+    return vector
+
+def hash_to_embedding(digest: bytes, vector_dim: int) -> List[float]:
+    """
+    Expand a hash digest into a normalized embedding vector
+    
+    The digest seeds a PRNG that draws one standard normal component per
+    dimension, as QuadrantManager._hash_to_embedding does.
+    
+    Args:
+        digest: Hash digest to expand
+        vector_dim: Embedding vector dimension
+        
+    Returns:
+        List[float]: Normalized embedding vector
+    """
+    gauss = random.Random(int.from_bytes(digest, 'little')).gauss
+    return normalize([gauss(0.0, 1.0) for _ in range(vector_dim)])
+
+def native_embedding(text: str, endpoint: str, embedding_model: str, vector_dim: int) -> Optional[List[float]]:
+    """
+    Get a normalized embedding from Ollama's /api/embed endpoint
+    
+    Args:
+        text: Text to generate embedding for
+        endpoint: Ollama generation endpoint; /api/embed on the same server is used
+        embedding_model: Ollama embedding model
+        vector_dim: Expected embedding vector dimension
+        
+    Returns:
+        List[float] if the endpoint returned a usable vector, otherwise None
+    """
+    base, sep, _ = endpoint.rpartition("/api/")
+    if not sep:
+        return None
+    
+    logger.info(f"Requesting native embedding from {base}/api/embed with model {embedding_model}")
+    response = _SESSION.post(
+        f"{base}/api/embed",
+        json={"model": embedding_model, "input": text},
+        timeout=OLLAMA_TIMEOUT
+    )
+    if response.status_code != 200:
+        logger.warning(f"Native embeddings unavailable: {response.status_code} - {response.text}")
+        return None
+    
+    embedding = (response.json().get("embeddings") or [[]])[0]
+    if len(embedding) != vector_dim:
+        logger.warning(f"Embedding model returned {len(embedding)} dimensions instead of {vector_dim}")
+        return None
+    return normalize(embedding)
+
+def generate_embedding(text: str, endpoint: str, model: str, vector_dim: int,
+                       embedding_model: Optional[str] = None) -> List[float]:
     """
     Generate embedding vector for text using Ollama or a fallback method
     
+    Follows QuadrantManager's order: Ollama's native /api/embed endpoint,
+    then a vector seeded by BLAKE2b over an Ollama summary and the text,
+    then a vector seeded by BLAKE2b over the text alone.
+    
     Args:
         text: Text to generate embedding for
         endpoint: Ollama API endpoint
-        model: Ollama model to use
+        model: Ollama model to use for summaries
         vector_dim: Embedding vector dimension
+        embedding_model: Ollama embedding model (optional)
         
     Returns:
         List[float]: Embedding vector
@@ -48,14 +142,36 @@ def generate_embedding(text: str, endpoint: str, model: str, vector_dim: int) ->
         logger.info(f"Using Ollama endpoint: {endpoint}")
         logger.info(f"Using model: {model}")
         
-        # Try calling Ollama for embeddings
+        # Encode once; the cache keys and both hash paths digest the same bytes
+        text_bytes = text.encode('utf-8')
+        
+        # Try calling Ollama for embeddings, unless this text was already embedded
         if endpoint:
             try:
-                # First, let's get a short summary of the text from Ollama
+                if embedding_model:
+                    cache_key = _embedding_cache_key(text_bytes, endpoint, f"native:{embedding_model}", vector_dim)
+                    cached = _EMBEDDING_CACHE.get(cache_key)
+                    if cached is not None:
+                        logger.info("Using cached embedding")
+                        return cached.tolist()
+                    
+                    embedding = native_embedding(text, endpoint, embedding_model, vector_dim)
+                    if embedding is not None:
+                        _EMBEDDING_CACHE[cache_key] = array('d', embedding)
+                        logger.info(f"Generated native embedding with dimension {len(embedding)}")
+                        return embedding
+                
+                cache_key = _embedding_cache_key(text_bytes, endpoint, f"summary-v2:{model}", vector_dim)
+                cached = _EMBEDDING_CACHE.get(cache_key)
+                if cached is not None:
+                    logger.info("Using cached embedding")
+                    return cached.tolist()
+                
+                # Otherwise get a short summary of the text from Ollama
                 summary_prompt = f"Summarize this text in a few key points, focusing on the most important technical details:\n\n{text}"
                 
                 logger.info("Sending request to Ollama for text summarization")
-                response = requests.post(
+                response = _SESSION.post(
                     endpoint,
                     json={
                         "model": model,
@@ -63,7 +179,8 @@ def generate_embedding(text: str, endpoint: str, model: str, vector_dim: int) ->
                         "stream": False,
                         "temperature": 0.1,  # Low temperature for consistent results
                         "num_predict": 256   # Short summary
-                    }
+                    },
+                    timeout=OLLAMA_TIMEOUT
                 )
                 
                 # Check response
@@ -75,25 +192,12 @@ def generate_embedding(text: str, endpoint: str, model: str, vector_dim: int) ->
                     logger.info(f"Generated summary: '{summary[:100]}...'")
                     
                     if summary:
-                        # We'll use the summary to generate a deterministic embedding
-                        summary_hash = hashlib.md5(summary.encode()).digest()
-                        text_hash = hashlib.sha256(text.encode()).digest()
-                        
-                        # Combine both hashes for a more robust embedding
-                        combined_hash = summary_hash + text_hash
+                        # Seed a deterministic embedding from the summary and the text
+                        seed_hash = hashlib.blake2b(f"{summary}\x00".encode(), digest_size=64)
+                        seed_hash.update(text_bytes)
                         
-                        # Convert to embedding
-                        embedding = []
-                        for i in range(vector_dim):
-                            # Use different parts of hash for each dimension
-                            pos = i % len(combined_hash)
-                            val = (combined_hash[pos] / 255.0) * 2.0 - 1.0  # Scale to [-1, 1]
-                            embedding.append(val)
-                        
-                        # Normalize
-                        magnitude = sum(x*x for x in embedding) ** 0.5
-                        if magnitude > 0:
-                            embedding = [x/magnitude for x in embedding]
+                        embedding = hash_to_embedding(seed_hash.digest(), vector_dim)
+                        _EMBEDDING_CACHE[cache_key] = array('d', embedding)
                         
                         logger.info(f"Generated embedding with dimension {len(embedding)}")
                         return embedding
@@ -108,24 +212,16 @@ def generate_embedding(text: str, endpoint: str, model: str, vector_dim: int) ->
         # Fallback to deterministic hash-based approach
         logger.info("Using hash-based embedding generation as fallback")
         
-        # Create a deterministic embedding from hash of content
-        hash_obj = hashlib.sha256(text.encode())
-        hash_bytes = hash_obj.digest()
-        
-        # Convert hash to a list of float values between -1 and 1
-        embedding = []
+        cache_key = _embedding_cache_key(text_bytes, "", HASH_EMBEDDING_SCHEME, vector_dim)
+        cached = _EMBEDDING_CACHE.get(cache_key)
+        if cached is not None:
+            return cached.tolist()
         
-        # Generate enough pseudo-random but deterministic values
-        for i in range(vector_dim):
-            # Use different parts of hash for each dimension
-            position = i % len(hash_bytes)
-            value = (hash_bytes[position] / 255.0) * 2.0 - 1.0  # Scale to [-1, 1]
-            embedding.append(value)
+        # Create a deterministic embedding from hash of content
+        hash_bytes = hashlib.blake2b(text_bytes, digest_size=64).digest()
         
-        # Normalize the vector (important for cosine similarity)
-        magnitude = sum(x*x for x in embedding) ** 0.5
-        if magnitude > 0:
-            embedding = [x/magnitude for x in embedding]
+        embedding = hash_to_embedding(hash_bytes, vector_dim)
+        _EMBEDDING_CACHE[cache_key] = array('d', embedding)
             
         logger.info(f"Generated fallback embedding with dimension {len(embedding)}")
         return embedding
@@ -135,6 +231,27 @@ def generate_embedding(text: str, endpoint: str, model: str, vector_dim: int) ->
         # Return a zero vector as final fallback
         return [0.0] * vector_dim
 
+def generate_embeddings_batch(texts: List[str], endpoint: str, model: str, vector_dim: int,
+                              embedding_model: Optional[str] = None) -> List[List[float]]:
+    """
+    Generate embedding vectors for several texts concurrently
+    
+    Args:
+        texts: Texts to generate embeddings for
+        endpoint: Ollama API endpoint
+        model: Ollama model to use for summaries
+        vector_dim: Embedding vector dimension
+        embedding_model: Ollama embedding model (optional)
+        
+    Returns:
+        List[List[float]]: Embedding vectors, in the same order as texts
+    """
+    if not texts:
+        return []
+    
+    with ThreadPoolExecutor(max_workers=len(texts)) as executor:
+        return list(executor.map(lambda text: generate_embedding(text, endpoint, model, vector_dim, embedding_model), texts))
+
 def test_similarity(vec1: List[float], vec2: List[float]) -> float:
     """
     Calculate cosine similarity between two vectors
@@ -149,15 +266,39 @@ def test_similarity(vec1: List[float], vec2: List[float]) -> float:
     if len(vec1) != len(vec2):
         raise ValueError("Vectors must have the same dimension")
     
-    dot_product = sum(x*y for x, y in zip(vec1, vec2))
-    mag1 = sum(x*x for x in vec1) ** 0.5
-    mag2 = sum(x*x for x in vec2) ** 0.5
+    dot_product = sum(map(operator.mul, vec1, vec2))
+    mag1 = math.hypot(*vec1)
+    mag2 = math.hypot(*vec2)
     
     if mag1 == 0 or mag2 == 0:
         return 0
     
     return dot_product / (mag1 * mag2)
 
+def similarity_matrix(vectors: List[List[float]]) -> List[List[float]]:
+    """
+    Calculate pairwise cosine similarities between vectors
+    
+    Each vector's magnitude is computed once up front rather than once per
+    pair it appears in.
+    
+    Args:
+        vectors: Vectors of equal dimension
+        
+    Returns:
+        List[List[float]]: Matrix where [i][j] is the similarity of vectors i and j
+    """
+    magnitudes = [math.hypot(*vec) for vec in vectors]
+    matrix = [[0.0] * len(vectors) for _ in vectors]
+    for i, (vec1, mag1) in enumerate(zip(vectors, magnitudes)):
+        for j in range(i, len(vectors)):
+            vec2, mag2 = vectors[j], magnitudes[j]
+            if len(vec1) != len(vec2):
+                raise ValueError("Vectors must have the same dimension")
+            if mag1 and mag2:
+                matrix[i][j] = matrix[j][i] = sum(map(operator.mul, vec1, vec2)) / (mag1 * mag2)
+    return matrix
+
 def main():
     """Main entry point"""
     args = parse_args()
@@ -169,23 +310,25 @@ def main():
     
     # Generate embeddings
     logger.info("Generating embeddings for test texts...")
-    embedding1 = generate_embedding(text1, args.endpoint, args.model, args.vector_dim)
-    embedding2 = generate_embedding(text2, args.endpoint, args.model, args.vector_dim)
-    embedding3 = generate_embedding(text3, args.endpoint, args.model, args.vector_dim)
+    embedding1, embedding2, embedding3 = generate_embeddings_batch(
+        [text1, text2, text3], args.endpoint, args.model, args.vector_dim, args.embedding_model
+    )
     
     # Test similarity
     logger.info("Testing similarity between embeddings...")
     
+    similarities = similarity_matrix([embedding1, embedding2, embedding3])
+    
     # Similar texts should have high similarity
-    similarity_1_2 = test_similarity(embedding1, embedding2)
+    similarity_1_2 = similarities[0][1]
     logger.info(f"Similarity between similar tables (users and users+extra field): {similarity_1_2:.4f}")
     
     # Different texts should have lower similarity
-    similarity_1_3 = test_similarity(embedding1, embedding3)
+    similarity_1_3 = similarities[0][2]
     logger.info(f"Similarity between different tables (users and orders): {similarity_1_3:.4f}")
     
     # Different texts should have lower similarity
-    similarity_2_3 = test_similarity(embedding2, embedding3)
+    similarity_2_3 = similarities[1][2]
     logger.info(f"Similarity between different tables (users+extra and orders): {similarity_2_3:.4f}")
     
     # Check if the similarity scores make sense
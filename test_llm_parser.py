@@ -14,12 +14,26 @@ import re
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
 logger = logging.getLogger(__name__)
 
+# Fields for manual extraction, in the order of _RECOMMENDATION_FIELD_RE's groups;
+# the alternation is compiled once at import and scanned in a single pass
+_RECOMMENDATION_FIELDS = (
+    "recommendation_type", "recommendation", "justification",
+    "implementation", "estimated_savings_pct", "priority",
+)
+_FREE_TEXT_VALUE = r'"([^"]*(?:"(?!\s*,\s*")[^"]*)*)"(?=\s*,\s*")'
+_RECOMMENDATION_FIELD_RE = re.compile(
+    r'"(?:recommendation_type"\s*:\s*"([^"]+)"'
+    r'|recommendation"\s*:\s*"([^"]+)"'
+    r'|justification"\s*:\s*' + _FREE_TEXT_VALUE +
+    r'|implementation"\s*:\s*' + _FREE_TEXT_VALUE +
+    r'|estimated_savings_pct"\s*:\s*(\d+)'
+    r'|priority"\s*:\s*"([^"]+)")'
+)
+
 def extract_recommendation_manually(json_str: str, referenced_tables=None):
     """
     Manually extract recommendation fields from improperly formatted JSON
     """
-    import re
-    
     # Initialize default recommendation
     recommendation = {
         "recommendation_type": "QUERY_OPTIMIZATION",
@@ -32,35 +46,18 @@ def extract_recommendation_manually(json_str: str, referenced_tables=None):
     
     # Try to extract each field using regex patterns
     try:
-        # Extract recommendation type
-        rec_type_match = re.search(r'"recommendation_type"\s*:\s*"([^"]+)"', json_str)
-        if rec_type_match:
-            recommendation["recommendation_type"] = rec_type_match.group(1).strip()
-            
-        # Extract recommendation
-        rec_match = re.search(r'"recommendation"\s*:\s*"([^"]+)"', json_str)
-        if rec_match:
-            recommendation["recommendation"] = rec_match.group(1).strip()
-            
-        # Extract justification - might contain newlines
-        just_match = re.search(r'"justification"\s*:\s*"(.*?)"(?=\s*,\s*")', json_str, re.DOTALL)
-        if just_match:
-            recommendation["justification"] = just_match.group(1).strip()
-            
-        # Extract implementation - might contain newlines and code
-        impl_match = re.search(r'"implementation"\s*:\s*"(.*?)"(?=\s*,\s*")', json_str, re.DOTALL)
-        if impl_match:
-            recommendation["implementation"] = impl_match.group(1).strip()
-            
-        # Extract estimated savings percentage
-        savings_match = re.search(r'"estimated_savings_pct"\s*:\s*(\d+)', json_str)
-        if savings_match:
-            recommendation["estimated_savings_pct"] = int(savings_match.group(1))
-            
-        # Extract priority
-        priority_match = re.search(r'"priority"\s*:\s*"([^"]+)"', json_str)
-        if priority_match:
-            recommendation["priority"] = priority_match.group(1).strip()
+        # Scan once, keeping the first value found for each field
+        extracted = {}
+        for match in _RECOMMENDATION_FIELD_RE.finditer(json_str):
+            field = _RECOMMENDATION_FIELDS[match.lastindex - 1]
+            if field not in extracted:
+                extracted[field] = match.group(match.lastindex)
+        
+        for field, value in extracted.items():
+            if field == "estimated_savings_pct":
+                recommendation[field] = int(value)
+            else:
+                recommendation[field] = value.strip()
         
         # Set table_id from referenced tables if available
         if referenced_tables and len(referenced_tables) > 0:
@@ -69,8 +66,7 @@ def extract_recommendation_manually(json_str: str, referenced_tables=None):
             recommendation["table_id"] = "unknown_table"
             
         # If we successfully extracted at least a few fields, return the recommendation
-        extracted_fields = sum(1 for m in [rec_type_match, rec_match, just_match, impl_match, savings_match, priority_match] if m)
-        if extracted_fields >= 2:  # At least two fields successfully extracted
+        if len(extracted) >= 2:  # At least two fields successfully extracted
             return recommendation
             
         return None
@@ -79,6 +75,21 @@ def extract_recommendation_manually(json_str: str, referenced_tables=None):
         logger.error(f"Error manually extracting recommendation: {e}")
         return None
 
+def repair_json(json_str: str):
+    """
+    Retry parsing after cheap repairs for common LLM JSON slips
+    """
+    repaired = json_str + "}" * max(0, json_str.count("{") - json_str.count("}"))
+    if '"' not in repaired:
+        repaired = repaired.replace("'", '"')
+    if repaired == json_str:
+        return None
+    try:
+        result = json.loads(repaired)
+    except json.JSONDecodeError:
+        return None
+    return result if isinstance(result, dict) else None
+
 def test_json_parsing():
     """Test JSON parsing with different input formats"""
     test_cases = [
@@ -139,15 +150,22 @@ def test_json_parsing():
             except json.JSONDecodeError as e:
                 logger.warning(f"Standard JSON parsing failed: {e}")
                 
-                # Try manual extraction
-                logger.info("Attempting manual extraction")
-                recommendation = extract_recommendation_manually(test["input"], test["tables"])
-                
+                # Try cheap repairs before manual extraction
+                recommendation = repair_json(test["input"])
                 if recommendation:
-                    logger.info(f"Manual extraction succeeded")
+                    recommendation["table_id"] = test["tables"][0] if test["tables"] else "unknown_table"
+                    logger.info("JSON parsing succeeded after repair")
                     logger.info(f"Result: {recommendation}")
                 else:
-                    logger.error("Manual extraction failed")
+                    # Try manual extraction
+                    logger.info("Attempting manual extraction")
+                    recommendation = extract_recommendation_manually(test["input"], test["tables"])
+                    
+                    if recommendation:
+                        logger.info(f"Manual extraction succeeded")
+                        logger.info(f"Result: {recommendation}")
+                    else:
+                        logger.error("Manual extraction failed")
             
             if test["expected_success"]:
                 if recommendation and "table_id" in recommendation:
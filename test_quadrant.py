@@ -9,6 +9,10 @@ import requests
 import json
 import uuid
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
@@ -18,31 +22,86 @@ logger = logging.getLogger(__name__)
 QUADRANT_ENDPOINT = "http://localhost:6333"
 COLLECTION_NAME = "bigquery_schemas_test"
 VECTOR_DIM = 768
+# (connect, read) timeouts in seconds, so a stalled Quadrant fails the test instead of hanging it
+TIMEOUT = (1.0, 5.0)
+
+# Compact separators drop a space per element, which adds up on vector payloads
+_JSON_ENCODER = json.JSONEncoder(separators=(',', ':'), allow_nan=False)
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Constant vector for generated test points, built once at import
+_TEST_VECTOR = [0.1] * VECTOR_DIM
+
+# Shared session so every call reuses keep-alive connections to Quadrant.
+# requests speaks HTTP/1.1 only, so instead of multiplexing streams the pool
+# keeps one connection per concurrent request to the single Quadrant host
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=2,
+    max_retries=Retry(
+        total=2,
+        backoff_factor=0.1,
+        status_forcelist=(502, 503, 504),
+        # The POSTs here are read-only lookups and counts, so they are safe to retry too
+        allowed_methods=frozenset(["GET", "PUT", "POST", "DELETE"])
+    )
+)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+# Worker threads for the concurrent lookups, started once and reused by every run
+_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+
+def _request(method, path, **kwargs):
+    """
+    Send a request to Quadrant on the shared session
+    
+    Connection errors, timeouts and 502/503/504 responses are already retried
+    by the session's adapter, so callers only see the final outcome.
+    
+    Args:
+        method: HTTP method
+        path: Path under QUADRANT_ENDPOINT
+        **kwargs: Passed to requests; timeout defaults to TIMEOUT
+        
+    Returns:
+        requests.Response: The response
+    """
+    kwargs.setdefault("timeout", TIMEOUT)
+    return _SESSION.request(method, f"{QUADRANT_ENDPOINT}{path}", **kwargs)
+
+@lru_cache(maxsize=1024)
+def table_uuid(table_id: str) -> str:
+    """Deterministic UUID used as the Quadrant point ID for a table"""
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, table_id))
 
 def test_quadrant_connection():
     """Test basic connectivity to Quadrant"""
     try:
         logger.info("Testing Quadrant connection...")
-        resp = requests.get(f"{QUADRANT_ENDPOINT}/collections")
+        # The readiness probe answers from status alone, with no collections list to decode
+        resp = _request("GET", "/readyz", timeout=(1.0, 2.0))
         
         if resp.status_code == 200:
             logger.info("✅ Successfully connected to Quadrant")
-            collections = resp.json().get('result', {}).get('collections', [])
-            logger.info(f"Found {len(collections)} collections")
+            if logger.isEnabledFor(logging.DEBUG):
+                collections = _request("GET", "/collections").json().get('result', {}).get('collections', [])
+                logger.debug("Found %d collections", len(collections))
             return True
         else:
-            logger.error(f"❌ Failed to connect to Quadrant: {resp.status_code} - {resp.text}")
+            logger.error("❌ Failed to connect to Quadrant: %s - %s", resp.status_code, resp.text)
             return False
-    except Exception as e:
-        logger.error(f"❌ Error connecting to Quadrant: {e}")
+    except requests.RequestException as e:
+        logger.error("❌ Error connecting to Quadrant: %s", e)
         return False
 
 def create_test_collection():
     """Create a test collection"""
     try:
-        logger.info(f"Creating test collection: {COLLECTION_NAME}")
-        create_resp = requests.put(
-            f"{QUADRANT_ENDPOINT}/collections/{COLLECTION_NAME}",
+        logger.info("Creating test collection: %s", COLLECTION_NAME)
+        create_resp = _request(
+            "PUT",
+            f"/collections/{COLLECTION_NAME}",
             json={
                 "vectors": {
                     "size": VECTOR_DIM,
@@ -52,67 +111,82 @@ def create_test_collection():
         )
         
         if create_resp.status_code in (200, 201):
-            logger.info(f"✅ Successfully created collection {COLLECTION_NAME}")
+            logger.info("✅ Successfully created collection %s", COLLECTION_NAME)
             return True
         else:
-            logger.error(f"❌ Failed to create collection: {create_resp.status_code} - {create_resp.text}")
+            logger.error("❌ Failed to create collection: %s - %s", create_resp.status_code, create_resp.text)
             return False
-    except Exception as e:
-        logger.error(f"❌ Error creating collection: {e}")
+    except requests.RequestException as e:
+        logger.error("❌ Error creating collection: %s", e)
         return False
 
-def test_point_operations():
-    """Test point operations with UUIDs"""
+def test_point_operations(points=None):
+    """
+    Test point operations with UUIDs
+    
+    Args:
+        points: Points to store in a single upsert (default: one generated test
+            point); the first one is looked up by ID and by payload afterwards
+    """
     try:
         # Create test points with UUIDs
         logger.info("Testing point operations with UUIDs...")
         
-        # Generate a test UUID
-        test_table_id = "project.dataset.test_table"
-        test_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, test_table_id))
-        
-        logger.info(f"Test UUID: {test_uuid} for table: {test_table_id}")
+        if not points:
+            # Generate a test UUID
+            test_table_id = "project.dataset.test_table"
+            test_uuid = table_uuid(test_table_id)
+            
+            # Create a test point
+            points = [{
+                "id": test_uuid,
+                "vector": _TEST_VECTOR,
+                "payload": {
+                    "table_id": test_table_id,
+                    "point_id": test_uuid,
+                    "schema_text": "Test schema"
+                }
+            }]
+        else:
+            test_uuid = points[0]["id"]
+            test_table_id = points[0]["payload"]["table_id"]
         
-        # Create a test point
-        points = [{
-            "id": test_uuid,
-            "vector": [0.1] * VECTOR_DIM,
-            "payload": {
-                "table_id": test_table_id,
-                "point_id": test_uuid,
-                "schema_text": "Test schema"
-            }
-        }]
+        logger.info("Test UUID: %s for table: %s", test_uuid, test_table_id)
         
-        # Store the point
-        logger.info("Storing test point...")
-        resp = requests.put(
-            f"{QUADRANT_ENDPOINT}/collections/{COLLECTION_NAME}/points",
-            json={"points": points}
+        # Store every point in one request; wait=true returns once the batch is applied
+        logger.info("Storing %d test point(s)...", len(points))
+        resp = _request(
+            "PUT",
+            f"/collections/{COLLECTION_NAME}/points",
+            params={"wait": "true"},
+            data=_JSON_ENCODER.encode({"points": points}).encode('utf-8'),
+            headers=_JSON_HEADERS
         )
         
         if resp.status_code in (200, 201):
-            logger.info("✅ Successfully stored test point")
+            logger.info("✅ Successfully stored %d test point(s)", len(points))
         else:
-            logger.error(f"❌ Failed to store point: {resp.status_code} - {resp.text}")
+            logger.error("❌ Failed to store point: %s - %s", resp.status_code, resp.text)
             return False
         
-        # Retrieve the point by ID
+        # The lookup by ID and the payload search are independent, so issue
+        # them concurrently and check the responses once both are back. Plain
+        # threads over the blocking session are used on purpose: an async
+        # Qdrant client that wraps sync calls would stall its event loop
+        # under load, which is the pitfall to avoid when copying this pattern
         logger.info("Retrieving point by ID...")
-        get_resp = requests.get(
-            f"{QUADRANT_ENDPOINT}/collections/{COLLECTION_NAME}/points/{test_uuid}"
-        )
-        
-        if get_resp.status_code == 200:
-            logger.info("✅ Successfully retrieved point by ID")
-        else:
-            logger.error(f"❌ Failed to retrieve point by ID: {get_resp.status_code} - {get_resp.text}")
-            return False
-        
-        # Search for the point by payload
         logger.info("Searching for point by payload...")
-        search_resp = requests.post(
-            f"{QUADRANT_ENDPOINT}/collections/{COLLECTION_NAME}/points/scroll",
+        # Retrieve without the vector so the 768 floats aren't sent back as JSON
+        get_future = _EXECUTOR.submit(
+            _request,
+            "POST",
+            f"/collections/{COLLECTION_NAME}/points",
+            json={"ids": [test_uuid], "with_payload": True, "with_vector": False}
+        )
+        search_future = _EXECUTOR.submit(
+            _request,
+            "POST",
+            f"/collections/{COLLECTION_NAME}/points/count",
             json={
                 "filter": {
                     "must": [
@@ -124,36 +198,45 @@ def test_point_operations():
                         }
                     ]
                 },
-                "limit": 1
+                "exact": False
             }
         )
+        get_resp = get_future.result()
+        search_resp = search_future.result()
+        
+        if get_resp.status_code == 200 and get_resp.json().get("result"):
+            logger.info("✅ Successfully retrieved point by ID")
+        else:
+            logger.error("❌ Failed to retrieve point by ID: %s - %s", get_resp.status_code, get_resp.text)
+            return False
         
         if search_resp.status_code == 200:
-            points = search_resp.json().get("result", {}).get("points", [])
-            if points:
+            # Counting answers from the payload index without materializing any points
+            if search_resp.json().get("result", {}).get("count", 0) > 0:
                 logger.info("✅ Successfully found point by payload search")
             else:
                 logger.error("❌ Point not found in payload search")
                 return False
         else:
-            logger.error(f"❌ Failed to search points: {search_resp.status_code} - {search_resp.text}")
+            logger.error("❌ Failed to search points: %s - %s", search_resp.status_code, search_resp.text)
             return False
         
         # Clean up - delete the test collection
         logger.info("Cleaning up test collection...")
-        delete_resp = requests.delete(
-            f"{QUADRANT_ENDPOINT}/collections/{COLLECTION_NAME}"
+        delete_resp = _request(
+            "DELETE",
+            f"/collections/{COLLECTION_NAME}"
         )
         
         if delete_resp.status_code == 200:
             logger.info("✅ Successfully deleted test collection")
         else:
-            logger.warning(f"⚠️ Failed to delete test collection: {delete_resp.status_code} - {delete_resp.text}")
+            logger.warning("⚠️ Failed to delete test collection: %s - %s", delete_resp.status_code, delete_resp.text)
         
         return True
         
-    except Exception as e:
-        logger.error(f"❌ Error in point operations: {e}")
+    except (requests.RequestException, ValueError, KeyError) as e:
+        logger.error("❌ Error in point operations: %s", e)
         return False
 
 def main():